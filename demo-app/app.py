@@ -33,6 +33,7 @@ pg = st.navigation(
         "Model queries": [
             st.Page("page_model_queries_basic.py", title="Basic model queries"),
             st.Page("page_model_queries_pwl.py", title="Piecewise Linear Functions"),
+            st.Page("page_verification.py", title="Verification"),
         ],
         "Saliency": [page_saliency],
         "Info": [
@@ -0,0 +1,161 @@
+import asyncio
+import atexit
+import threading
+import numpy as np
+
+
+class BatchingEvaluator:
+    """
+    Collects the images of concurrent requests and evaluates them together in
+    a single run of the eval query, one input set per image. A batch is run
+    once it holds `max_batch_size` images, or `max_wait` seconds after its
+    first image came in, whichever comes first. Every caller gets back only the
+    rows of its own input set(s).
+
+    The eval queries handle many input sets at a far lower cost per image than
+    one run per image (see the `InputSize` benchmark in notebook 1.6), so under
+    load this trades a few milliseconds of latency for throughput.
+
+    Up to `max_concurrent_batches` batches are evaluated at the same time,
+    each on a worker thread with its own cursor (see `Evaluator.eval`), while
+    the next batch is being collected.
+
+    The batching runs on an asyncio loop in a background thread. `submit` can
+    be awaited from that loop's perspective (e.g. from async code), `eval` is
+    a blocking drop-in for `Evaluator.eval`, as used from the Streamlit pages.
+    `close` stops the loop; it is also called when the process exits.
+    """
+
+    def __init__(
+        self, evaluator, max_batch_size=32, max_wait=0.01, max_concurrent_batches=4
+    ):
+        self.evaluator = evaluator
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrent_batches = max_concurrent_batches
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        atexit.register(self.close)
+
+    async def _start(self):
+        # The queue, semaphore and tasks have to be created on the loop that
+        # uses them.
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.max_concurrent_batches)
+        # The batch that is being collected, or waiting for a slot, and the
+        # batches that are being evaluated, by their task.
+        self.collecting = []
+        self.batches = {}
+        self.worker = asyncio.create_task(self._run())
+
+    def close(self):
+        """Cancels the requests that are still pending and stops the loop."""
+        if self.loop.is_closed():
+            return
+
+        asyncio.run_coroutine_threadsafe(self._stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def _stop(self):
+        batches = [self.collecting, *self.batches.values()]
+        tasks = [self.worker, *self.batches]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Every request is either in one of the batches or still in the queue.
+        # Cancelling a future that already has its result does nothing.
+        for batch in batches:
+            for _, future in batch:
+                future.cancel()
+
+        while not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            future.cancel()
+
+        await self.loop.shutdown_default_executor()
+
+    def eval(self, images):
+        return asyncio.run_coroutine_threadsafe(self.submit(images), self.loop).result()
+
+    async def submit(self, images):
+        """
+        Queue one or more images, and wait for the batch they end up in. Only
+        to be awaited on this evaluator's loop; use `eval` from anywhere else.
+        """
+        images = np.asarray(images, dtype=np.float32).reshape(
+            -1, self.evaluator.input_size
+        )
+        future = self.loop.create_future()
+        await self.queue.put((images, future))
+
+        return await future
+
+    async def _collect(self):
+        """Wait for a first request, then gather more until the batch is full."""
+        batch = self.collecting
+        batch.append(await self.queue.get())
+        size = len(batch[0][0])
+        deadline = self.loop.time() + self.max_wait
+
+        while size < self.max_batch_size:
+            timeout = deadline - self.loop.time()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(request)
+            size += len(request[0])
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+
+            # While all slots are taken, new requests wait in the queue, and
+            # end up in the next batch.
+            await self.slots.acquire()
+            task = asyncio.create_task(self._eval_batch(batch))
+            self.batches[task] = batch
+            task.add_done_callback(self.batches.pop)
+            self.collecting = []
+
+    async def _eval_batch(self, batch):
+        try:
+            results = await asyncio.to_thread(
+                self.evaluator.eval, np.concatenate([images for images, _ in batch])
+            )
+            self._route(batch, results)
+        except Exception as e:
+            # Every caller has to hear back, or its eval() would wait forever.
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.slots.release()
+
+    def _route(self, batch, results):
+        """
+        Hand every caller the rows of its own input sets. The input sets are
+        numbered in the order of the batch, and renumbered from 0 per caller,
+        so the result looks like it came from a separate eval.
+        """
+        input_set_ids = results["input_set_id"]
+        first = 0
+        for images, future in batch:
+            last = first + len(images)
+            if not future.done():
+                mask = (input_set_ids >= first) & (input_set_ids < last)
+                rows = {column: values[mask] for column, values in results.items()}
+                rows["input_set_id"] = rows["input_set_id"] - first
+                future.set_result(rows)
+            first = last
@@ -0,0 +1,107 @@
+import queue
+import threading
+import numpy as np
+import database
+
+
+class CheckpointStreamer:
+    """
+    Adds the checkpoints of a model to a multimodel database while it is still
+    being trained. Use it as the callback of a training loop: calling it with
+    the model and the current epoch (or step) copies the state_dict, and a
+    background thread inserts the copy while training continues. Every model
+    is inserted in a single transaction, so it can be queried as soon as it
+    shows up in the model table, without waiting for the training to end.
+
+    Only every `every`-th step is kept, named after `name`. The writer is given
+    at most `max_pending` checkpoints to catch up on; after that the training
+    waits for it, so the copies don't pile up in memory if inserting is slower
+    than training.
+
+    `insert` is called as insert(con, state_dict, name) and returns the model
+    ID, e.g. database.insert_model (for CNNs and ReLU-FNNs alike), or
+    database.insert_checkpoint (with a functools.partial for its threshold)
+    for the versioned schema. The writer uses its own cursor, so `con` stays
+    free for queries in the meantime.
+    """
+
+    def __init__(
+        self,
+        con,
+        insert=database.insert_model,
+        every=1,
+        max_pending=2,
+        name="Epoch {step}",
+    ):
+        self.cursor = con.cursor()
+        self.insert = insert
+        self.every = every
+        self.name = name
+
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.model_ids = []
+        self.error = None
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __call__(self, model, step):
+        if step % self.every == 0:
+            self.submit(model.state_dict(), self.name.format(step=step))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, state_dict, name):
+        """
+        Queues a checkpoint, blocking while the writer is max_pending behind.
+        The parameters are copied first, since the optimizer keeps updating
+        them in place.
+        """
+        self._raise_error()
+        snapshot = {
+            key: np.array(database._to_numpy(values))
+            for key, values in state_dict.items()
+        }
+        self.queue.put((snapshot, name))
+
+    def flush(self):
+        """Waits until every queued checkpoint is in the database."""
+        self.queue.join()
+        self._raise_error()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.cursor.close()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise Exception("Inserting a checkpoint failed") from self.error
+
+    def _run(self):
+        while True:
+            checkpoint = self.queue.get()
+            try:
+                if checkpoint is None:
+                    return
+
+                # After a failure the rest is skipped, but still taken from
+                # the queue so the training doesn't block on it.
+                if self.error is None:
+                    self.cursor.begin()
+                    try:
+                        model_id = self.insert(self.cursor, *checkpoint)
+                        self.cursor.commit()
+                    except Exception:
+                        self.cursor.rollback()
+                        raise
+                    self.model_ids.append(model_id)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
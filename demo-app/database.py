@@ -0,0 +1,674 @@
+import os
+import duckdb as db
+import numpy as np
+
+
+# We have to hardcode this
+INPUT_SIZE = 28
+
+
+def connect(path):
+    """
+    Opens a model database read-only. The file is attached instead of imported,
+    so nothing is loaded up front and several processes can open the same file.
+    Since the model itself can't be written to, the input is registered on the
+    connection instead (see evaluator.Evaluator), which takes precedence over
+    the (empty) input table in the file.
+    """
+    con = db.connect()
+    con.execute(f"ATTACH '{path}' AS model (READ_ONLY)")
+    con.execute("USE model")
+
+    return con
+
+
+def save(con, path):
+    """
+    Writes the tables of the in-memory database to a native DuckDB file,
+    replacing any existing file. Only the data is copied: sequences (and the
+    defaults that use them) can't refer to another database, and the file is
+    only meant to be read anyway. Views are recreated on top of the copied
+    tables.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    tables = con.execute(
+        "SELECT table_name FROM duckdb_tables() WHERE database_name = 'memory'"
+    ).fetchall()
+    views = con.execute(
+        """
+        SELECT sql
+        FROM duckdb_views()
+        WHERE database_name = 'memory' AND NOT internal
+        """
+    ).fetchall()
+
+    con.execute(f"ATTACH '{path}' AS persisted")
+    try:
+        for (table,) in tables:
+            con.execute(f"CREATE TABLE persisted.{table} AS FROM memory.{table}")
+
+        # The view definitions don't name a database, so they are created
+        # from within the new one.
+        con.execute("USE persisted")
+        for (sql,) in views:
+            con.execute(sql)
+    finally:
+        con.execute("USE memory")
+        con.execute("DETACH persisted")
+
+
+def _drop_schema(con):
+    """
+    Drops the views, tables and sequences of any of the schemas below, so the
+    same connection can be reused for another database. save() copies every
+    table, so leftovers (e.g. the kernel table of the compact schema) would
+    end up in the next file.
+    """
+    (database,) = con.execute("SELECT current_database()").fetchone()
+    objects = con.execute(
+        """
+        SELECT 1, 'VIEW', view_name FROM duckdb_views()
+        WHERE database_name = $database AND NOT internal
+        UNION ALL
+        SELECT 2, 'TABLE', table_name FROM duckdb_tables()
+        WHERE database_name = $database AND NOT temporary
+        UNION ALL
+        SELECT 3, 'SEQUENCE', sequence_name FROM duckdb_sequences()
+        WHERE database_name = $database AND NOT temporary
+        ORDER BY 1
+        """,
+        {"database": database},
+    ).fetchall()
+
+    # Views depend on tables, and tables on sequences (for their defaults).
+    for _, kind, name in objects:
+        con.execute(f"DROP {kind} {name}")
+
+
+def create_single_model_schema(con, compact=False):
+    """
+    Besides the network itself, each node stores its layer (0 being the input
+    layer), its 1-based position within that layer and its role, and each edge
+    the layer of its source. This way queries can select e.g. the input nodes
+    with a simple filter, instead of deriving them from the edges.
+    """
+    _drop_schema(con)
+
+    con.execute(
+        """
+        CREATE TABLE node(
+            id INTEGER PRIMARY KEY,
+            bias REAL,
+            name TEXT,
+            layer INTEGER,
+            unit_idx INTEGER,
+            is_input BOOLEAN,
+            is_hidden BOOLEAN,
+            is_output BOOLEAN
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE edge(
+            src INTEGER,
+            dst INTEGER,
+            weight REAL,
+            src_layer INTEGER
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE input(
+            input_set_id INTEGER,
+            input_node_idx INTEGER,
+            input_value REAL
+        )"""
+    )
+
+    if compact:
+        _create_compact_tables(con)
+
+
+def create_multimodel_schema(con):
+    """
+    Every node and edge belongs to a model. Node IDs are unique over all
+    models, so to line up the models of the same architecture (e.g. to compare
+    epochs), nodes and edges also get a position: their number within their
+    own model, which is the same for the same node or edge in every model.
+    """
+    _drop_schema(con)
+
+    con.execute("CREATE SEQUENCE seq_model START 1")
+
+    con.execute(
+        """
+        CREATE TABLE model(
+            id INTEGER PRIMARY KEY DEFAULT NEXTVAL('seq_model'),
+            name TEXT
+        )
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE node(
+            id INTEGER PRIMARY KEY,
+            model_id INTEGER,
+            position INTEGER,
+            bias REAL,
+            name TEXT,
+            layer INTEGER,
+            unit_idx INTEGER,
+            is_input BOOLEAN,
+            is_hidden BOOLEAN,
+            is_output BOOLEAN
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE edge(
+            model_id INTEGER,
+            position INTEGER,
+            src INTEGER,
+            dst INTEGER,
+            weight REAL,
+            src_layer INTEGER
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE input(
+            input_set_id INTEGER,
+            input_node_idx INTEGER,
+            input_value REAL
+        )"""
+    )
+
+
+def create_versioned_schema(con):
+    """
+    A multimodel schema for checkpoints of the same model (e.g. its epochs),
+    which only stores the weights that changed between checkpoints:
+
+    - base_node and base_edge hold the topology, with the biases and weights of
+      the first checkpoint. Edges get an ID to refer to them.
+    - node_delta and edge_delta hold, per later checkpoint, only the biases and
+      weights that changed, with their new value. Each change also stores the
+      checkpoint of the next change of the same value (NULL if there is none
+      yet), so the changes that apply to a model are found with a simple range
+      check instead of searching for the latest one.
+
+    The node and edge views resolve every model to the same columns as the
+    multimodel schema, so the multimodel queries work unchanged: a value is the
+    one of the latest checkpoint up to the model that changed it, or the base
+    value if none did. As in the multimodel schema, node IDs are unique over
+    all models: the base IDs are offset by the number of base nodes for every
+    model before it. The ID of the base node or edge serves as its position.
+    """
+    _drop_schema(con)
+
+    con.execute("CREATE SEQUENCE seq_model START 1")
+
+    con.execute(
+        """
+        CREATE TABLE model(
+            id INTEGER PRIMARY KEY DEFAULT NEXTVAL('seq_model'),
+            name TEXT
+        )
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE base_node(
+            id INTEGER PRIMARY KEY,
+            bias REAL,
+            name TEXT,
+            layer INTEGER,
+            unit_idx INTEGER,
+            is_input BOOLEAN,
+            is_hidden BOOLEAN,
+            is_output BOOLEAN
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE base_edge(
+            id INTEGER,
+            src INTEGER,
+            dst INTEGER,
+            weight REAL,
+            src_layer INTEGER
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE node_delta(
+            model_id INTEGER,
+            node_id INTEGER,
+            bias REAL,
+            next_model_id INTEGER
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE edge_delta(
+            model_id INTEGER,
+            edge_id INTEGER,
+            weight REAL,
+            next_model_id INTEGER
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE input(
+            input_set_id INTEGER,
+            input_node_idx INTEGER,
+            input_value REAL
+        )"""
+    )
+
+    # A change applies from its checkpoint up to the next change of the same
+    # bias or weight. The cross join is in a subquery, so the join order
+    # survives the view being written out again (see save).
+    con.execute(
+        """
+        CREATE VIEW node AS
+        SELECT
+            b.model_id,
+            b.id_offset + b.id AS id,
+            b.id AS position,
+            COALESCE(d.bias, b.bias) AS bias,
+            b.name,
+            b.layer,
+            b.unit_idx,
+            b.is_input,
+            b.is_hidden,
+            b.is_output
+        FROM (
+            SELECT m.id AS model_id, (m.id - 1) * s.num_nodes AS id_offset, b.*
+            FROM model m
+            CROSS JOIN (SELECT COUNT(*) AS num_nodes FROM base_node) s
+            CROSS JOIN base_node b
+        ) b
+        LEFT JOIN node_delta d
+            ON d.node_id = b.id
+            AND d.model_id <= b.model_id
+            AND b.model_id < COALESCE(d.next_model_id, 2147483647)
+        """
+    )
+    con.execute(
+        """
+        CREATE VIEW edge AS
+        SELECT
+            b.model_id,
+            b.id AS position,
+            b.id_offset + b.src AS src,
+            b.id_offset + b.dst AS dst,
+            COALESCE(d.weight, b.weight) AS weight,
+            b.src_layer
+        FROM (
+            SELECT m.id AS model_id, (m.id - 1) * s.num_nodes AS id_offset, b.*
+            FROM model m
+            CROSS JOIN (SELECT COUNT(*) AS num_nodes FROM base_node) s
+            CROSS JOIN base_edge b
+        ) b
+        LEFT JOIN edge_delta d
+            ON d.edge_id = b.id
+            AND d.model_id <= b.model_id
+            AND b.model_id < COALESCE(d.next_model_id, 2147483647)
+        """
+    )
+
+
+def insert_checkpoint(con, state_dict, name, threshold=0):
+    """
+    Adds a checkpoint to the versioned schema. The first one becomes the base,
+    every later one only stores the biases and weights that differ by more than
+    threshold from the previous checkpoint. The comparison is with the previous
+    checkpoint as it is stored, so a stored value never drifts further than the
+    threshold from the real one.
+
+    All checkpoints must have the same topology, and are expected to be added
+    in order.
+    """
+    # The translation into nodes and edges is done in a separate database, as
+    # if it were a single model.
+    staging = db.connect()
+    create_single_model_schema(staging)
+    load_cnn_into_db(staging, state_dict)
+    nodes = staging.execute("SELECT * FROM node").fetchnumpy()
+    edges = staging.execute("SELECT * FROM edge").fetchnumpy()
+    staging.close()
+
+    # The topology is checked before anything is inserted, so a rejected
+    # checkpoint doesn't leave a model behind.
+    (num_base_nodes,) = con.execute("SELECT COUNT(*) FROM base_node").fetchone()
+    if num_base_nodes > 0:
+        (num_edges,) = con.execute(
+            """
+            SELECT COUNT(*)
+            FROM edges e
+            JOIN base_edge b ON b.src = e.src AND b.dst = e.dst
+            """
+        ).fetchone()
+        if len(nodes["id"]) != num_base_nodes or num_edges != len(edges["src"]):
+            raise ValueError(
+                f"{name} doesn't have the same topology as the base model"
+            )
+
+    (model_id,) = con.execute(
+        "INSERT INTO model (name) VALUES ($name) RETURNING (id)", {"name": name}
+    ).fetchone()
+
+    if num_base_nodes == 0:
+        con.execute("INSERT INTO base_node BY NAME SELECT * FROM nodes")
+        con.execute(
+            """
+            INSERT INTO base_edge
+            SELECT ROW_NUMBER() OVER (ORDER BY dst, src), src, dst, weight, src_layer
+            FROM edges
+            """
+        )
+        return model_id
+
+    # The current value of a bias or weight is its latest change (the one
+    # without a next change yet), or else the base value.
+    params = {"model_id": model_id, "threshold": threshold}
+    con.execute(
+        """
+        INSERT INTO node_delta
+        SELECT $model_id, n.id, n.bias, NULL
+        FROM nodes n
+        JOIN base_node b ON b.id = n.id
+        LEFT JOIN node_delta d ON d.node_id = n.id AND d.next_model_id IS NULL
+        WHERE ABS(n.bias - COALESCE(d.bias, b.bias)) > $threshold
+        """,
+        params,
+    )
+    con.execute(
+        """
+        INSERT INTO edge_delta
+        SELECT $model_id, b.id, e.weight, NULL
+        FROM edges e
+        JOIN base_edge b ON b.src = e.src AND b.dst = e.dst
+        LEFT JOIN edge_delta d ON d.edge_id = b.id AND d.next_model_id IS NULL
+        WHERE ABS(e.weight - COALESCE(d.weight, b.weight)) > $threshold
+        ORDER BY b.id
+        """,
+        params,
+    )
+
+    # The changes they replace now end at this checkpoint.
+    con.execute(
+        """
+        UPDATE node_delta SET next_model_id = $model_id
+        WHERE next_model_id IS NULL
+        AND model_id < $model_id
+        AND node_id IN (SELECT node_id FROM node_delta WHERE model_id = $model_id)
+        """,
+        {"model_id": model_id},
+    )
+    con.execute(
+        """
+        UPDATE edge_delta SET next_model_id = $model_id
+        WHERE next_model_id IS NULL
+        AND model_id < $model_id
+        AND edge_id IN (SELECT edge_id FROM edge_delta WHERE model_id = $model_id)
+        """,
+        {"model_id": model_id},
+    )
+
+    return model_id
+
+
+def _create_compact_tables(con):
+    """
+    In the compact layout, the edges of a converted convolution are not stored.
+    Each kernel weight is stored once instead, together with a description of
+    the sliding window, and the eval derives the edges from both.
+    """
+    con.execute(
+        """
+        CREATE TABLE conv_layer(
+            layer INTEGER PRIMARY KEY,
+            src_offset INTEGER,
+            dst_offset INTEGER,
+            in_channels INTEGER,
+            out_channels INTEGER,
+            in_size INTEGER,
+            out_size INTEGER,
+            kernel_size INTEGER
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE kernel(
+            layer INTEGER,
+            out_channel INTEGER,
+            in_channel INTEGER,
+            kx INTEGER,
+            ky INTEGER,
+            weight REAL
+        )"""
+    )
+
+
+def _to_numpy(tensor):
+    if isinstance(tensor, np.ndarray):
+        return tensor
+
+    return tensor.detach().cpu().numpy()
+
+
+def _layers(state_dict):
+    """
+    Groups the state_dict per layer: (name, weight, bias). Dropout layers have
+    no parameters, so they don't show up here.
+    """
+    layers = {}
+    for key, values in state_dict.items():
+        name, kind = key.rsplit(".", 1)
+        layers.setdefault(name, {})[kind] = _to_numpy(values)
+
+    return [(name, p["weight"], p["bias"]) for name, p in layers.items()]
+
+
+def _pixel_names(prefix, size, channels=None):
+    """
+    Names of the nodes of an image-shaped layer, in the order they are stored:
+    row by row, and all channels of a pixel next to each other.
+    """
+    y, x, c = np.indices((size, size, channels or 1)).reshape(3, -1).astype(str)
+    names = np.char.add(f"{prefix}.", c) if channels else prefix
+    names = np.char.add(np.char.add(names, "."), x)
+
+    return np.char.add(np.char.add(names, "."), y)
+
+
+def _conv_edges(weight, src_offset, dst_offset, in_size, out_channel):
+    """
+    The edges of one output channel of a convolution, i.e. every kernel weight
+    connected once for each position of the sliding window.
+    """
+    _, in_channels, kernel_size, _ = weight.shape
+    out_channels = weight.shape[0]
+    out_size = in_size - kernel_size + 1
+
+    y, x, ky, kx, c_in = np.indices(
+        (out_size, out_size, kernel_size, kernel_size, in_channels)
+    ).reshape(5, -1)
+
+    src = src_offset + ((y + ky) * in_size + (x + kx)) * in_channels + c_in
+    dst = dst_offset + (y * out_size + x) * out_channels + out_channel
+
+    return {
+        "src": src.astype(np.int32),
+        "dst": dst.astype(np.int32),
+        "weight": weight[out_channel, c_in, ky, kx].astype(np.float32),
+    }
+
+
+def _dense_edges(weight, src_ids, dst_ids):
+    num_dst, num_src = weight.shape
+
+    return {
+        "src": np.repeat(src_ids, num_dst).astype(np.int32),
+        "dst": np.tile(dst_ids, num_src).astype(np.int32),
+        "weight": np.ascontiguousarray(weight.T, dtype=np.float32).ravel(),
+    }
+
+
+def load_cnn_into_db(con, state_dict, model_id=None, compact=False):
+    """
+    Translates a CNN into a ReLU-FNN and inserts it. Every pixel of every
+    convolution channel becomes a node, and the model is expected to consist of
+    convolutions followed by fully connected layers (as in model.Net). A model
+    without convolutions is a ReLU-FNN already, and is inserted as is.
+
+    With compact=True, the convolution edges are not expanded: each kernel is
+    stored once in the kernel table, and conv_layer holds the node ID ranges and
+    dimensions needed to derive the edges. This requires the compact schema.
+
+    If a model_id is given, it is added to every node and edge and the node IDs
+    continue from the highest ID in the database. Nodes and edges then also get
+    their position in the model, counting from 1 in the order they are inserted.
+    """
+    (max_id_in_db,) = con.execute("SELECT COALESCE(MAX(id), 0) FROM node").fetchone()
+    layers = _layers(state_dict)
+    num_edges_inserted = 0
+
+    def insert_nodes(ids, bias, names, layer):
+        num_nodes = len(ids)
+        nodes = {
+            "id": ids,
+            "bias": bias,
+            "name": names,
+            "layer": np.full(num_nodes, layer, dtype=np.int32),
+            "unit_idx": np.arange(1, num_nodes + 1, dtype=np.int32),
+            "is_input": np.full(num_nodes, layer == 0),
+            "is_hidden": np.full(num_nodes, 0 < layer < len(layers)),
+            "is_output": np.full(num_nodes, layer == len(layers)),
+        }
+        if model_id is not None:
+            nodes["model_id"] = np.full(num_nodes, model_id, dtype=np.int32)
+            nodes["position"] = ids - np.int32(max_id_in_db)
+        con.execute("INSERT INTO node BY NAME SELECT * FROM nodes")
+
+    def insert_edges(edges, src_layer):
+        nonlocal num_edges_inserted
+        num_edges = len(edges["src"])
+        edges["src_layer"] = np.full(num_edges, src_layer, dtype=np.int32)
+        if model_id is not None:
+            edges["model_id"] = np.full(num_edges, model_id, dtype=np.int32)
+            edges["position"] = np.arange(
+                num_edges_inserted + 1,
+                num_edges_inserted + num_edges + 1,
+                dtype=np.int32,
+            )
+        num_edges_inserted += num_edges
+        con.execute("INSERT INTO edge BY NAME SELECT * FROM edges")
+
+    # Input nodes (1 channel for now). Image-shaped layers are tracked by their
+    # channels and size, fully connected ones by their number of nodes only.
+    # If the first layer is fully connected, the input is a plain vector.
+    offset = max_id_in_db + 1
+    first_weight = layers[0][1]
+    if first_weight.ndim == 4:
+        channels, size = 1, INPUT_SIZE
+        num_nodes = size * size
+        input_names = _pixel_names("input", size)
+    else:
+        channels, size = None, None
+        num_nodes = first_weight.shape[1]
+        input_names = np.char.add("input.", np.arange(num_nodes).astype(str))
+
+    insert_nodes(
+        np.arange(offset, offset + num_nodes, dtype=np.int32),
+        np.zeros(num_nodes, dtype=np.float32),
+        input_names,
+        0,
+    )
+
+    for layer, (name, weight, bias) in enumerate(layers, start=1):
+        src_offset = offset
+        offset += num_nodes
+
+        if weight.ndim == 4:
+            out_channels, in_channels, kernel_size, _ = weight.shape
+            if in_channels != channels:
+                raise Exception(f"{name} expects {in_channels} input channels")
+
+            out_size = size - kernel_size + 1
+            num_nodes = out_size * out_size * out_channels
+
+            # The bias of a node is simply the bias of the corresponding kernel.
+            insert_nodes(
+                np.arange(offset, offset + num_nodes, dtype=np.int32),
+                np.tile(bias, out_size * out_size).astype(np.float32),
+                _pixel_names(name, out_size, out_channels),
+                layer,
+            )
+
+            if compact:
+                c_out, c_in, ky, kx = np.indices(weight.shape).reshape(4, -1)
+                kernels = {
+                    "layer": np.full(len(c_out), layer, dtype=np.int32),
+                    "out_channel": c_out.astype(np.int32),
+                    "in_channel": c_in.astype(np.int32),
+                    "kx": kx.astype(np.int32),
+                    "ky": ky.astype(np.int32),
+                    "weight": weight[c_out, c_in, ky, kx].astype(np.float32),
+                }
+                con.execute("INSERT INTO kernel BY NAME SELECT * FROM kernels")
+                con.execute(
+                    "INSERT INTO conv_layer VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        layer,
+                        src_offset,
+                        offset,
+                        in_channels,
+                        out_channels,
+                        size,
+                        out_size,
+                        kernel_size,
+                    ],
+                )
+            else:
+                for c in range(out_channels):
+                    insert_edges(
+                        _conv_edges(weight, src_offset, offset, size, c), layer - 1
+                    )
+
+            channels, size = out_channels, out_size
+        else:
+            num_dst, num_src = weight.shape
+            src_ids = np.arange(src_offset, src_offset + num_src)
+
+            if size is not None:
+                # The first fully connected layer follows torch.flatten, which
+                # orders by channel first, while our nodes are stored per pixel.
+                c, y, x = np.indices((channels, size, size)).reshape(3, -1)
+                src_ids = src_offset + (y * size + x) * channels + c
+
+            num_nodes = num_dst
+            dst_ids = np.arange(offset, offset + num_nodes)
+            insert_nodes(
+                dst_ids.astype(np.int32),
+                bias.astype(np.float32),
+                np.char.add(f"{name}.", np.arange(num_nodes).astype(str)),
+                layer,
+            )
+            insert_edges(_dense_edges(weight, src_ids, dst_ids), layer - 1)
+
+            channels, size = None, None
+
+
+def insert_model(con, state_dict, name):
+    (model_id,) = con.execute(
+        "INSERT INTO model (name) VALUES ($name) RETURNING (id)", {"name": name}
+    ).fetchone()
+
+    load_cnn_into_db(con, state_dict, model_id=model_id)
+
+    return model_id
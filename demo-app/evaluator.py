@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+class Evaluator:
+    """
+    Runs one of the eval queries on a connection. The query is read once, and
+    the input images are handed to DuckDB as NumPy arrays, which it scans
+    directly as the input table. The results are returned as NumPy arrays.
+
+    Every eval runs on its own cursor, with the input registered on that cursor
+    only. The connection is shared by all sessions of the app, so this way
+    concurrent requests don't overwrite each other's input and can run in
+    parallel against the same (read-only) model.
+    """
+
+    def __init__(self, con, query_path, input_size=28 * 28):
+        with open(query_path) as file:
+            self.query = file.read()
+
+        self.con = con
+        self.input_size = input_size
+
+        # Cursors start out in the default database, not in the one that was
+        # selected with USE on the connection (see database.connect).
+        (self.database,) = con.execute("SELECT current_database()").fetchone()
+
+    def input_arrays(self, images):
+        """
+        The columns of the input table for a batch of images (or a single one).
+        Every image becomes an input set, its pixels the input values.
+        """
+        values = np.asarray(images, dtype=np.float32).reshape(-1, self.input_size)
+        num_input_sets = len(values)
+
+        return {
+            "input_set_id": np.repeat(
+                np.arange(num_input_sets, dtype=np.int32), self.input_size
+            ),
+            "input_node_idx": np.tile(
+                np.arange(1, self.input_size + 1, dtype=np.int32), num_input_sets
+            ),
+            "input_value": values.ravel(),
+        }
+
+    def cursor(self, images=None):
+        """
+        A new cursor on the model. If images are given, they replace the input
+        table on this cursor, so other queries on the same input (e.g. saliency)
+        can be run on it as well.
+        """
+        cursor = self.con.cursor()
+        cursor.execute(f'USE "{self.database}"')
+        if images is not None:
+            cursor.register("input", self.input_arrays(images))
+
+        return cursor
+
+    def eval(self, images):
+        with self.cursor(images) as cursor:
+            return cursor.execute(self.query).fetchnumpy()
+
+
+class MultiModelEvaluator(Evaluator):
+    """
+    Evaluates the models of a multimodel database with a query that takes the
+    ID of a single model as its parameter (see eval_multi.sql). Every model is
+    evaluated separately, each on its own cursor and thread, so the models run
+    in parallel and a model only costs as much as a single model eval.
+
+    Only the models in `model_ids` are evaluated, or all models in the database
+    if it is None. The results of the models are concatenated, in that order.
+    Without any models, the columns are returned empty.
+    """
+
+    def __init__(self, con, query_path, input_size=28 * 28, model_ids=None):
+        super().__init__(con, query_path, input_size)
+
+        if model_ids is None:
+            with self.cursor() as cursor:
+                model_ids = [
+                    model_id
+                    for (model_id,) in cursor.execute(
+                        "SELECT id FROM model ORDER BY id"
+                    ).fetchall()
+                ]
+
+        self.model_ids = list(model_ids)
+
+    def eval_model(self, images, model_id):
+        with self.cursor(images) as cursor:
+            return cursor.execute(self.query, [model_id]).fetchnumpy()
+
+    def eval(self, images, model_ids=None):
+        model_ids = self.model_ids if model_ids is None else list(model_ids)
+
+        if not model_ids:
+            # No model has ID NULL, so this returns the (empty) columns of the
+            # query with their types.
+            return self.eval_model(images, None)
+
+        with ThreadPoolExecutor(max_workers=len(model_ids)) as pool:
+            results = list(
+                pool.map(lambda model_id: self.eval_model(images, model_id), model_ids)
+            )
+
+        return {
+            column: np.concatenate([result[column] for result in results])
+            for column in results[0]
+        }
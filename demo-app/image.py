@@ -1,9 +1,11 @@
 import streamlit as st
 import settings
 import torch
-import duckdb as db
 import pandas as pd
 import numpy as np
+import database
+from evaluator import Evaluator
+from batcher import BatchingEvaluator
 from model import Net
 from PIL import Image, ImageFilter, ImageEnhance
 
@@ -14,6 +16,17 @@ def get_eval_query():
         return file.read()
 
 
+@st.cache_resource
+def get_evaluator():
+    return Evaluator(database.connect(settings.DB_SINGLE), settings.EVAL_QUERY_PATH)
+
+
+@st.cache_resource
+def get_batching_evaluator():
+    # Single images of concurrent sessions are evaluated together.
+    return BatchingEvaluator(get_evaluator())
+
+
 @st.cache_resource
 def get_model():
     model = Net()
@@ -23,29 +36,11 @@ def get_model():
     return model
 
 
-def eval_image_sql(con, image):
-    try:
-        con.execute("BEGIN TRANSACTION")
-    except db.TransactionException:
-        con.execute("ROLLBACK")
-        con.execute("BEGIN TRANSACTION")
-
-    con.execute("TRUNCATE input")
-
-    rows = []
-    for i, pixel in enumerate(image.flatten()):
-        rows.append([0, i + 1, pixel.item()])
-
-    df = pd.DataFrame(rows)
-    con.execute("INSERT INTO input SELECT * FROM df")
-
-    eval_query = get_eval_query()
-    results_df = con.sql(eval_query).df()
-    con.execute("COMMIT")
-
-    predicted_digit = results_df["log_softmax"].idxmax()
+def eval_image_sql(evaluator, image):
+    results = evaluator.eval(image)
+    predicted_digit = results["log_softmax"].argmax()
 
-    return results_df, predicted_digit
+    return pd.DataFrame(results), predicted_digit
 
 
 def eval_image_model(model, image):
@@ -1,24 +1,30 @@
 import streamlit as st
 import settings
+import database
+from evaluator import MultiModelEvaluator
+from batcher import BatchingEvaluator
 import numpy as np
 import pandas as pd
-import duckdb as db
 
 
 @st.cache_resource
-def connect_to_db_multiple_epochs():
-    con = db.connect()
-    con.execute(f"IMPORT DATABASE '{settings.DB_MULTIPLE_EPOCHS}'")
-
-    return con
+def get_evaluator_multiple_epochs():
+    return BatchingEvaluator(
+        MultiModelEvaluator(
+            database.connect(settings.DB_MULTIPLE_EPOCHS),
+            settings.EVAL_MULTI_QUERY_PATH,
+        )
+    )
 
 
 @st.cache_resource
-def connect_to_db_multiple_sizes():
-    con = db.connect()
-    con.execute(f"IMPORT DATABASE '{settings.DB_MULTIPLE_SIZES}'")
-
-    return con
+def get_evaluator_multiple_sizes():
+    return BatchingEvaluator(
+        MultiModelEvaluator(
+            database.connect(settings.DB_MULTIPLE_SIZES),
+            settings.EVAL_MULTI_QUERY_PATH,
+        )
+    )
 
 
 @st.cache_data
@@ -27,46 +33,49 @@ def get_eval_query():
         return file.read()
 
 
-# We do the logmax in python for convenience.
-def log_softmax(values):
-    max_val = np.max(values)
-    log_sum_exp = np.log(np.sum(np.exp(values - max_val)))
-    return np.log(np.exp(values - max_val)) - log_sum_exp
+@st.cache_data
+def get_drift_queries():
+    with open(settings.MODEL_DRIFT_QUERY_PATH) as file:
+        layers_query = file.read()
+    with open(settings.MODEL_DRIFT_NEURONS_QUERY_PATH) as file:
+        neurons_query = file.read()
 
+    return layers_query, neurons_query
 
-def eval_image_sql(con, image):
-    con.execute("TRUNCATE input")
 
-    rows = []
-    for i, pixel in enumerate(image.flatten()):
-        rows.append([0, i + 1, pixel.item()])
+def get_model_names(evaluator):
+    with evaluator.evaluator.cursor() as cursor:
+        names = cursor.execute("SELECT id, name FROM model ORDER BY id").fetchall()
 
-    df = pd.DataFrame(rows)
-    con.execute("INSERT INTO input SELECT * FROM df")
+    return dict(names)
 
-    eval_query = get_eval_query()
-    results_df = con.sql(eval_query).df()
 
-    # predicted_digit = results_df["log_softmax"].idxmax()
-    predicted_digit = -1
+def model_drift(evaluator, model_id_a, model_id_b, k=10):
+    """
+    How much the model changed from model_id_a to model_id_b: the drift per
+    layer, and the k neurons that changed the most.
+    """
+    layers_query, neurons_query = get_drift_queries()
 
-    results_df["log_softmax"] = results_df.groupby("name")["output_value"].transform(
-        log_softmax
-    )
+    with evaluator.evaluator.cursor() as cursor:
+        layers = cursor.execute(layers_query, [model_id_a, model_id_b]).df()
+        neurons = cursor.execute(neurons_query, [model_id_a, model_id_b, k]).df()
+
+    return layers, neurons
 
-    predictions = []
-    for df in [group for _, group in results_df.groupby("name")]:
-        df = df.reset_index()
-        probabilities = np.exp(df["log_softmax"])
-        confidence = probabilities.max()
 
-        predicted_digit = df["log_softmax"].idxmax()
-        model_name = df.iloc[0]["name"]
-        model_id = df.iloc[0]["id"]
-        predictions.append([model_id, model_name, predicted_digit, confidence])
+def eval_image_sql(evaluator, image):
+    results_df = pd.DataFrame(evaluator.eval(image))
 
+    # The log-softmax and the prediction come with the results of the query.
+    predictions = results_df[results_df["is_prediction"]]
     predictions = pd.DataFrame(
-        predictions, columns=["Model ID", "Model name", "Prediction", "Confidence"]
+        {
+            "Model ID": predictions["id"],
+            "Model name": predictions["name"],
+            "Prediction": predictions["digit"],
+            "Confidence": np.exp(predictions["log_softmax"]),
+        }
     ).sort_values(by="Model ID")
 
     return results_df, predictions
@@ -4,17 +4,15 @@ import matplotlib.pyplot as plt
 from io import BytesIO
 import image
 import pandas as pd
-import duckdb as db
+import numpy as np
 import settings
+import database
 import random
 
 
 @st.cache_resource
-def connect_to_db():
-    con = db.connect()
-    con.execute(f"IMPORT DATABASE '{settings.DB_SINGLE}'")
-
-    return con
+def connect_to_compact_db():
+    return database.connect(settings.DB_SINGLE_COMPACT)
 
 
 def random_image(dataset):
@@ -36,7 +34,8 @@ def display_image(img):
 
 
 eval_query = image.get_eval_query()
-con = connect_to_db()
+evaluator = image.get_evaluator()
+batching_evaluator = image.get_batching_evaluator()
 model = image.get_model()
 
 
@@ -99,25 +98,28 @@ with st.expander("MNIST classifier"):
     """
     )
 
-    output = "SELECT * FROM node ORDER BY RANDOM() LIMIT 5;\n"
-    output += str(con.sql("SELECT * FROM node ORDER BY RANDOM() LIMIT 5"))
-    output += "SELECT * FROM edge ORDER BY RANDOM() LIMIT 5;\n"
-    output += str(con.sql("SELECT * FROM edge ORDER BY RANDOM() LIMIT 5"))
+    with evaluator.cursor() as con:
+        output = "SELECT * FROM node ORDER BY RANDOM() LIMIT 5;\n"
+        output += str(con.sql("SELECT * FROM node ORDER BY RANDOM() LIMIT 5"))
+        output += "SELECT * FROM edge ORDER BY RANDOM() LIMIT 5;\n"
+        output += str(con.sql("SELECT * FROM edge ORDER BY RANDOM() LIMIT 5"))
+        counts = str(
+            con.sql(
+                """
+            SELECT
+            (SELECT COUNT(*) FROM node) AS num_nodes,
+            (SELECT COUNT(*) FROM edge) AS num_edges
+        """
+            )
+        )
+
     st.code(output)
 
     """
     To show that the network is nontrivial, let's query the nodes and edges:
     """
 
-    st.code(
-        con.sql(
-            """
-        SELECT
-        (SELECT COUNT(*) FROM node) AS num_nodes,
-        (SELECT COUNT(*) FROM edge) AS num_edges
-    """
-        )
-    )
+    st.code(counts)
 
 
 with st.expander("The eval query"):
@@ -134,7 +136,7 @@ with st.expander("The eval query"):
 
 def eval_random_image():
     img, _ = random_image(dataset)
-    result_df, prediction = image.eval_image_sql(con, img.unsqueeze(0))
+    result_df, prediction = image.eval_image_sql(batching_evaluator, img.unsqueeze(0))
 
     col1, col2 = st.columns([1, 4])
     with col1:
@@ -146,27 +148,35 @@ def eval_random_image():
 
 
 def eval_multiple_images(images):
-    try:
-        con.execute("BEGIN TRANSACTION")
-    except db.TransactionException:
-        con.execute("ROLLBACK")
-        con.execute("BEGIN TRANSACTION")
+    # Each image becomes an input set, so all of them are evaluated at once.
+    results = evaluator.eval(np.stack([img.numpy() for img in images]))
 
-    con.execute("TRUNCATE input")
+    return pd.DataFrame(results)
 
-    rows = []
-    for input_set_id, img in enumerate(images):
-        for i, pixel in enumerate(img.flatten()):
-            rows.append([input_set_id, i + 1, pixel.item()])
 
-    df = pd.DataFrame(rows)
-    con.execute("INSERT INTO input SELECT * FROM df")
+with st.expander("Compact convolutions"):
+    st.markdown(
+        """
+    Translating the convolutions into regular hidden layers copies every kernel
+    weight onto an edge for each position of the sliding window. We can also
+    store each kernel only once, together with the dimensions of the sliding
+    window, and let the `eval` query derive the edges of the convolutions:
+    """
+    )
 
-    eval_query = image.get_eval_query()
-    results_df = con.sql(eval_query).df()
-    con.execute("COMMIT")
+    con_compact = connect_to_compact_db()
+    st.code(
+        con_compact.sql(
+            """
+        SELECT
+        (SELECT COUNT(*) FROM edge) AS num_edges,
+        (SELECT COUNT(*) FROM kernel) AS num_kernel_weights
+    """
+        )
+    )
 
-    return results_df
+    with open(settings.EVAL_COMPACT_QUERY_PATH) as file:
+        st.code(file.read(), language="sql")
 
 
 with st.expander("Running the query"):
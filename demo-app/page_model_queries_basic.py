@@ -1,85 +1,29 @@
 import streamlit as st
 import settings
-import duckdb as db
+import database
 
 
-query_layers_single = """WITH RECURSIVE input_nodes AS (
-    SELECT id
-    FROM node
-    WHERE id NOT IN
-    (SELECT dst FROM edge)
-),
-nodes_with_layer AS (
-    SELECT
-        id,
-        0 as layer
-    FROM input_nodes
-
-    UNION ALL
-
-    SELECT
-        n.id,
-        nodes_with_layer.layer + 1 as layer
-    FROM edge e
-    JOIN nodes_with_layer ON nodes_with_layer.id = e.src
-    JOIN node n ON e.dst = n.id
-    GROUP BY e.dst, n.id, layer
-)
-SELECT layer, COUNT(id) AS number_of_nodes
-FROM nodes_with_layer
+query_layers_single = """SELECT layer, COUNT(id) AS number_of_nodes
+FROM node
 GROUP BY layer
 ORDER BY layer;
 """
 
-query_layers_multi = """WITH RECURSIVE input_nodes AS (
-    SELECT
-        model_id,
-        id
-    FROM node
-    WHERE id NOT IN
-    (SELECT dst FROM edge)
-),
-nodes_with_layer AS (
-    SELECT
-        model_id,
-        id,
-        0 as layer
-    FROM input_nodes
-
-    UNION ALL
-
-    SELECT
-        n.model_id,
-        n.id,
-        nodes_with_layer.layer + 1 as layer
-    FROM edge e
-    JOIN nodes_with_layer
-      ON nodes_with_layer.id = e.src
-      AND nodes_with_layer.model_id = e.model_id
-    JOIN node n ON e.dst = n.id
-    GROUP BY n.model_id, e.dst, n.id, layer
-)
-SELECT
+query_layers_multi = """SELECT
   m.id,
   m.name,
   n.layer,
   COUNT(n.id) AS number_of_nodes
 FROM model m
-JOIN nodes_with_layer n ON n.model_id = m.id
+JOIN node n ON n.model_id = m.id
 GROUP BY m.id, n.layer, m.name
 ORDER BY m.id, n.layer;
 """
 
-query_parameters_single = """WITH input_nodes AS (
-    SELECT id
-    FROM node
-    WHERE id NOT IN
-    (SELECT dst FROM edge)
-),
-num_biases AS (
+query_parameters_single = """WITH num_biases AS (
     SELECT COUNT(bias) AS num_biases
     FROM node
-    WHERE id NOT IN (SELECT id FROM input_nodes)
+    WHERE NOT is_input
 ),
 num_weights AS (
     SELECT COUNT(weight) AS num_weights FROM edge
@@ -89,18 +33,10 @@ SELECT
     + (SELECT num_weights FROM num_weights)
 AS learnable_parameters"""
 
-query_parameters_multi = """WITH input_nodes AS (
-    SELECT
-      model_id,
-      id
-    FROM node
-    WHERE id NOT IN
-    (SELECT dst FROM edge)
-),
-num_biases AS (
+query_parameters_multi = """WITH num_biases AS (
     SELECT model_id, COUNT(bias) AS num_biases
     FROM node
-    WHERE id NOT IN (SELECT id FROM input_nodes)
+    WHERE NOT is_input
     GROUP BY model_id
 ),
 num_weights AS (
@@ -126,32 +62,12 @@ HAVING MAX(ABS(weight)) <= 0.01
 """
 
 query_pruning_multi = """
-WITH num_input_nodes AS (
-  SELECT model_id, COUNT(id) AS num_input_nodes
+WITH num_hidden_nodes AS (
+  SELECT model_id, COUNT(id) AS num_hidden_nodes
   FROM node
-  WHERE id NOT IN (SELECT dst FROM edge)
+  WHERE is_hidden
   GROUP BY model_id
 ),
-num_output_nodes AS (
-  SELECT model_id, COUNT(id) AS num_output_nodes
-  FROM node
-  WHERE id NOT IN (SELECT src FROM edge)
-  GROUP BY model_id
-),
-num_total_nodes AS (
-  SELECT model_id, COUNT(id) AS num_nodes
-  FROM node
-  GROUP BY model_id
-),
-num_hidden_nodes AS (
-  SELECT
-    t.model_id,
-    t.num_nodes - i.num_input_nodes - o.num_output_nodes AS num_hidden_nodes
-  FROM num_total_nodes t
-  JOIN num_input_nodes i ON i.model_id = t.model_id
-  JOIN num_output_nodes o ON o.model_id = t.model_id
-  GROUP BY t.model_id, t.num_nodes, i.num_input_nodes, o.num_output_nodes
-),
 prunable_nodes AS (
   SELECT
     model_id,
@@ -185,18 +101,12 @@ ORDER BY m.id
 
 @st.cache_resource
 def connect_to_db_multi():
-    con = db.connect()
-    con.execute(f"IMPORT DATABASE '{settings.DB_MULTIPLE_SIZES}'")
-
-    return con
+    return database.connect(settings.DB_MULTIPLE_SIZES)
 
 
 @st.cache_resource
 def connect_to_db_single():
-    con = db.connect()
-    con.execute(f"IMPORT DATABASE '{settings.DB_SINGLE}'")
-
-    return con
+    return database.connect(settings.DB_SINGLE)
 
 
 con_single = connect_to_db_single()
@@ -225,7 +135,9 @@ with st.expander("Model complexity"):
     - How many learnable parameters does the model have?
     - How many layers does the model have, with how many nodes each?
 
-    The queries are as follows; for the learnable parameters:
+    Each node stores its layer and its role (input, hidden or output), which
+    are filled in when the model is loaded. The queries are therefore simple
+    aggregations; for the learnable parameters:
     """
     )
 
@@ -1,8 +1,8 @@
 import streamlit as st
 import settings
+import database
 from model import ReLUFNN
 import torch
-import duckdb as db
 import math
 import numpy as np
 import matplotlib.pyplot as plt
@@ -26,17 +26,31 @@ def get_query():
     return query
 
 
+@st.cache_data
+def get_integral_query():
+    with open(settings.PWL_INTEGRAL_QUERY_PATH) as file:
+        query = file.read()
+
+    return query
+
+
 @st.cache_resource
 def connect_to_db():
-    con = db.connect()
-    con.execute(f"IMPORT DATABASE '{settings.DB_PWL}'")
+    con = database.connect(settings.DB_PWL)
+
+    # The PWL is computed once and kept in a temp table, with the cumulative
+    # area for the integrals. pwl_materialize.sql reads it from this view.
+    con.execute(f"CREATE TEMP VIEW pwl_points AS {get_query().rstrip().rstrip(';')}")
+    with open(settings.PWL_MATERIALIZE_QUERY_PATH) as file:
+        con.execute(file.read())
 
     return con
 
 
 model = get_model()
-con = connect_to_db()
 query = get_query()
+integral_query = get_integral_query()
+con = connect_to_db()
 
 
 st.title("Piecewise Linear Functions")
@@ -82,6 +96,14 @@ with st.expander("The query"):
     st.markdown(
         "We have constructed the following query, which extracts the breakpoints and the slopes to the next breakpoint. This can be used to reconstruct the PWL."
     )
+    st.markdown(
+        """
+        Passing a breakpoint switches exactly one hidden node on or off, so the
+        query doesn't evaluate the network at every breakpoint. It sorts the
+        breakpoints once and keeps a running sum of the changes to the slope and
+        intercept, which also scales to networks with many hidden nodes.
+        """
+    )
 
     st.code(query, language="sql")
 
@@ -104,7 +126,7 @@ with st.expander("Visualizing the result"):
     """
     )
 
-    result_df = con.execute(query).df()
+    result_df = con.execute("SELECT x, y, slope FROM pwl ORDER BY x").df()
 
     x_values = result_df["x"].values
     y_values = result_df["y"].values
@@ -139,30 +161,25 @@ with st.expander("Integral query"):
     st.markdown(
         """
     With the output of this query, it is also trivial to calculate the integral
-    of the neural network's output function. We only need to adapt the last part
-    of the query:
+    of the neural network's output function. We store the result of the query
+    once, together with the area under the function from the first breakpoint
+    up to each breakpoint:
     """
     )
 
-    st.code(
+    with open(settings.PWL_MATERIALIZE_QUERY_PATH) as file:
+        st.code(file.read(), language="sql")
+
+    st.markdown(
         """
-    points_and_slopes_with_next AS (
-    SELECT
-        x,
-        y,
-        slope,
-        LEAD(x) OVER (ORDER BY x) AS next_x
-    FROM points_and_slopes
-)
-SELECT
-    SUM(((y + (y + slope * (next_x - x))) / 2) * (next_x - x)) AS integral
-FROM
-    points_and_slopes_with_next
-WHERE next_x IS NOT NULL AND x >= ? and x <= ?;
-    """,
-        language="sql",
+    The integral over a range is then the difference of the area up to its end
+    and up to its start. The area up to a bound is looked up at the breakpoint
+    right before it, plus the part of the segment up to the bound itself:
+    """
     )
 
+    st.code(integral_query, language="sql")
+
 
 with st.expander("Integral"):
     (start, end) = st.slider(
@@ -188,9 +205,6 @@ with st.expander("Integral"):
     ax.set_ylim(-1.5, 1.5)
     st.pyplot(fig)
 
-    with open("queries/integral.sql") as file:
-        integral_query = file.read()
-
     st.text("Query result:")
     st.dataframe(con.execute(integral_query, [start, end]).df())
 
@@ -1,24 +1,21 @@
 import streamlit as st
-import duckdb as db
 import numpy as np
 import saliency
 from PIL import Image
 from streamlit_drawable_canvas import st_canvas
 import settings
+import database
 import image
 import multimodel
 
 
 @st.cache_resource
 def connect_to_db():
-    con = db.connect()
-    con.execute(f"IMPORT DATABASE '{settings.DB_SINGLE}'")
+    return database.connect(settings.DB_SINGLE)
 
-    return con
 
-
-con_epochs = multimodel.connect_to_db_multiple_epochs()
-con_sizes = multimodel.connect_to_db_multiple_sizes()
+evaluator_epochs = multimodel.get_evaluator_multiple_epochs()
+evaluator_sizes = multimodel.get_evaluator_multiple_sizes()
 model = image.get_model()
 
 
@@ -55,12 +52,12 @@ if has_image:
 
     st.text("Prediction across model sizes:")
     with st.spinner("Querying across sizes..."):
-        _, sql_prediction = multimodel.eval_image_sql(con_sizes, img)
+        _, sql_prediction = multimodel.eval_image_sql(evaluator_sizes, img)
         final_df = multimodel.pivot(sql_prediction)
         st.dataframe(final_df)
 
     st.text("Prediction across epochs:")
     with st.spinner("Querying across epochs..."):
-        _, sql_prediction = multimodel.eval_image_sql(con_epochs, img)
+        _, sql_prediction = multimodel.eval_image_sql(evaluator_epochs, img)
         final_df = multimodel.pivot(sql_prediction)
         st.dataframe(final_df)
@@ -4,7 +4,7 @@ import streamlit as st
 import multimodel
 
 
-con = multimodel.connect_to_db_multiple_epochs()
+evaluator = multimodel.get_evaluator_multiple_epochs()
 eval_query = multimodel.get_eval_query()
 
 
@@ -31,7 +31,34 @@ for i in range(0, 5):
     with col2:
         with st.spinner("Querying..."):
             image = (image - 0.1307) / 0.3081
-            _, sql_prediction = multimodel.eval_image_sql(con, image)
+            _, sql_prediction = multimodel.eval_image_sql(evaluator, image)
 
             final_df = multimodel.pivot(sql_prediction)
             st.dataframe(final_df)
+
+
+st.header("Drift between epochs")
+st.text(
+    "Since every epoch has the same architecture, the weights of two epochs can be lined up and compared directly."
+)
+
+model_names = multimodel.get_model_names(evaluator)
+model_ids = list(model_names)
+
+col1, col2 = st.columns(2)
+with col1:
+    model_id_a = st.selectbox("From", model_ids, index=0, format_func=model_names.get)
+with col2:
+    model_id_b = st.selectbox(
+        "To", model_ids, index=len(model_ids) - 1, format_func=model_names.get
+    )
+
+with st.spinner("Querying..."):
+    layers, neurons = multimodel.model_drift(evaluator, model_id_a, model_id_b)
+
+st.text(
+    "Per layer, counting edges and nodes as stored: a convolution kernel weight is an edge for every output pixel, so its change counts that many times (except in relative_l2)."
+)
+st.dataframe(layers)
+st.text("The neurons that changed the most:")
+st.dataframe(neurons)
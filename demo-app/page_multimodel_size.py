@@ -4,7 +4,7 @@ import streamlit as st
 import multimodel
 
 
-con = multimodel.connect_to_db_multiple_sizes()
+evaluator = multimodel.get_evaluator_multiple_sizes()
 eval_query = multimodel.get_eval_query()
 
 
@@ -29,7 +29,7 @@ for i in range(0, 5):
     with col2:
         with st.spinner("Querying..."):
             image = (image - 0.1307) / 0.3081
-            _, sql_prediction = multimodel.eval_image_sql(con, image)
+            _, sql_prediction = multimodel.eval_image_sql(evaluator, image)
             
             final_df = multimodel.pivot(sql_prediction)
             st.dataframe(final_df)
@@ -1,5 +1,4 @@
 import streamlit as st
-import duckdb as db
 import numpy as np
 import saliency
 from PIL import Image
@@ -8,14 +7,6 @@ import settings
 import image
 
 
-@st.cache_resource
-def connect_to_db():
-    con = db.connect()
-    con.execute(f"IMPORT DATABASE '{settings.DB_SINGLE}'")
-
-    return con
-
-
 @st.dialog("Eval query")
 def show_eval_query():
     with open(settings.EVAL_QUERY_PATH) as file:
@@ -24,7 +15,8 @@ def show_eval_query():
     st.code(eval_query, language="sql")
 
 
-con = connect_to_db()
+evaluator = image.get_evaluator()
+batching_evaluator = image.get_batching_evaluator()
 model = image.get_model()
 
 
@@ -65,7 +57,7 @@ with col1:
         img = (img - 0.1307) / 0.3081
 
         model_result, model_prediction = image.eval_image_model(model, img)
-        sql_result, sql_prediction = image.eval_image_sql(con, img)
+        sql_result, sql_prediction = image.eval_image_sql(batching_evaluator, img)
 
         st.markdown(
             f"We compare the output of the PyTorch model and that of the SQL query. The prediction is **{sql_prediction}**."
@@ -79,7 +71,13 @@ with col1:
 with col2:
     if has_image:
         with st.spinner("Saliency map:"):
-            saliency_map = saliency.get_saliency_map(con)
+            saliency_map = saliency.get_saliency_map_incremental(evaluator, img)
             saliency_image = saliency.to_heatmap_image(saliency_map)
             st.text("Actual saliency")
             st.image(saliency_image)
+
+        with st.spinner("Gradient saliency map:"):
+            (gradient_map,) = saliency.get_gradient_saliency_maps(evaluator, img)
+            gradient_image = saliency.to_heatmap_image(gradient_map)
+            st.text("Gradient saliency")
+            st.image(gradient_image)
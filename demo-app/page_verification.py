@@ -0,0 +1,74 @@
+from torchvision import datasets, transforms
+import numpy as np
+import streamlit as st
+import settings
+import image
+import verification
+
+
+evaluator = image.get_evaluator()
+
+# The model expects normalized images, so the perturbation and the range of
+# valid pixel values are normalized as well.
+MEAN = 0.1307
+STD = 0.3081
+
+
+st.title("Verification")
+
+with st.expander("Intro", expanded=True):
+    st.markdown(
+        """
+    A classifier is *robust* around an image if no small change to the image
+    changes its prediction. We check this for changes of at most $\\epsilon$ to
+    every pixel, by propagating a lower and an upper bound for each node
+    through the network, layer by layer. If the lower bound of the predicted
+    digit exceeds the upper bound of every other digit, the prediction is
+    certified for all images within that distance.
+
+    The bounds are computed for many images at once, at about the cost of two
+    evals. They are sound but not tight: an image that isn't certified may still
+    be robust.
+    """
+    )
+
+    with open(settings.VERIFY_ROBUSTNESS_QUERY_PATH) as file:
+        st.code(file.read(), language="sql")
+
+
+dataset = datasets.MNIST("../data", train=False, transform=transforms.ToTensor())
+
+epsilon = st.slider(
+    "Maximum change per pixel (ε)",
+    min_value=0.0,
+    max_value=0.05,
+    value=0.01,
+    step=0.001,
+    format="%.3f",
+)
+num_images = st.slider("Number of test images", min_value=1, max_value=100, value=20)
+
+images = np.stack([dataset[i][0].numpy() for i in range(num_images)])
+labels = [dataset[i][1] for i in range(num_images)]
+
+with st.spinner("Verifying..."):
+    results = verification.verify_robustness(
+        evaluator,
+        (images - MEAN) / STD,
+        epsilon / STD,
+        (0 - MEAN) / STD,
+        (1 - MEAN) / STD,
+    )
+
+output_ids = np.sort(results["id"].unique())
+predictions = results[results["is_prediction"]].reset_index(drop=True)
+predictions["prediction"] = np.searchsorted(output_ids, predictions["id"])
+predictions["label"] = labels
+
+st.metric(
+    "Certified robust",
+    f"{predictions['is_robust'].sum()} / {num_images}",
+)
+st.dataframe(
+    predictions[["label", "prediction", "value", "lower_bound", "upper_bound", "is_robust"]]
+)
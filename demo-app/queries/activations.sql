@@ -0,0 +1,41 @@
+WITH RECURSIVE input_values AS (
+    -- The input table holds a single image
+    SELECT input_node_idx, input_value FROM input
+),
+input_nodes AS (
+    SELECT
+        id,
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
+),
+-- The eval, but keeping the value of each node before the ReLU (z) as well.
+tx AS (
+    SELECT
+        e.dst AS id,
+        n.bias + SUM(e.weight * v.input_value) AS z
+    FROM input_nodes i
+    JOIN input_values v ON i.input_node_idx = v.input_node_idx
+    JOIN edge e ON i.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias
+
+    UNION ALL
+
+    SELECT
+        e.dst AS id,
+        n.bias + SUM(e.weight * GREATEST(0, tx.z)) AS z
+    FROM tx
+    JOIN edge e ON tx.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias
+)
+SELECT
+    tx.id,
+    tx.z,
+    -- No ReLU for the output layer (per definition)
+    CASE WHEN n.is_output THEN tx.z ELSE GREATEST(0, tx.z) END AS value,
+    n.is_output
+FROM tx
+JOIN node n ON tx.id = n.id
+ORDER BY tx.id;
@@ -0,0 +1,119 @@
+WITH RECURSIVE input_values AS (
+    SELECT input_set_id, input_node_idx, input_value FROM input
+),
+input_nodes AS (
+    SELECT
+        id,
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
+),
+output_nodes AS (
+    SELECT id, bias, layer
+    FROM node
+    WHERE is_output
+),
+-- Eval
+tx AS (
+    -- In the compact layout the input layer is the base case, so that the first
+    -- convolution is handled by the recursive step like any other layer.
+    SELECT
+        v.input_set_id AS input_set_id,
+        0 AS layer,
+        i.id AS id,
+        v.input_value AS value
+    FROM input_nodes i
+    JOIN input_values v ON i.input_node_idx = v.input_node_idx
+
+    UNION ALL
+
+    SELECT
+        f.input_set_id AS input_set_id,
+        f.layer,
+        f.dst AS id,
+        GREATEST(
+            0,
+            n.bias + SUM(f.weight * f.value)
+        ) AS value
+    FROM (
+        -- The outgoing edges of the previous layer. For a convolution they are
+        -- derived from the node's pixel position and the kernel.
+        SELECT
+            s.input_set_id,
+            s.layer,
+            s.value,
+            s.dst_offset
+                + ((s.y - k.ky) * s.out_size + (s.x - k.kx)) * s.out_channels
+                + k.out_channel AS dst,
+            k.weight
+        FROM (
+            -- Nodes are stored row by row, with all channels of a pixel next
+            -- to each other, so the position follows from the ID.
+            SELECT
+                tx.input_set_id,
+                c.layer,
+                tx.value,
+                c.dst_offset,
+                c.out_channels,
+                c.out_size,
+                (tx.id - c.src_offset) % c.in_channels AS channel,
+                ((tx.id - c.src_offset) // c.in_channels) % c.in_size AS x,
+                ((tx.id - c.src_offset) // c.in_channels) // c.in_size AS y
+            FROM tx
+            JOIN conv_layer c ON c.layer = tx.layer + 1
+        ) s
+        JOIN kernel k ON k.layer = s.layer AND k.in_channel = s.channel
+        WHERE s.x - k.kx BETWEEN 0 AND s.out_size - 1
+        AND s.y - k.ky BETWEEN 0 AND s.out_size - 1
+
+        UNION ALL
+
+        -- For a fully connected layer they are read from the edge table.
+        SELECT
+            tx.input_set_id,
+            tx.layer + 1 AS layer,
+            tx.value,
+            e.dst,
+            e.weight
+        FROM tx
+        JOIN edge e ON e.src = tx.id
+        WHERE tx.layer + 1 < (SELECT MAX(layer) FROM output_nodes)
+    ) f
+    JOIN node n ON f.dst = n.id
+    GROUP BY f.dst, f.layer, n.bias, f.input_set_id
+),
+-- The output layer is fully connected and has no ReLU.
+t_out AS (
+    SELECT
+        tx.input_set_id AS input_set_id,
+        o.bias + SUM(e.weight * tx.value) AS value,
+        e.dst AS id
+    FROM output_nodes o
+    JOIN edge e ON e.dst = o.id
+    JOIN tx ON tx.id = e.src AND tx.layer = o.layer - 1
+    GROUP BY e.dst, o.bias, tx.input_set_id
+),
+-- Softmax
+max_value AS (
+    SELECT
+        input_set_id,
+        MAX(value) AS max_val
+    FROM t_out
+    GROUP BY input_set_id
+),
+log_sum_exp AS (
+    SELECT
+        t.input_set_id,
+        LN(SUM(EXP(t.value - m.max_val))) AS log_sum_exp
+    FROM t_out t
+    JOIN max_value m ON t.input_set_id = m.input_set_id
+    GROUP BY t.input_set_id
+)
+SELECT
+    t.input_set_id,
+    t.id,
+    t.value - m.max_val - lse.log_sum_exp AS log_softmax
+FROM t_out t
+JOIN max_value m ON t.input_set_id = m.input_set_id
+JOIN log_sum_exp lse ON t.input_set_id = lse.input_set_id
+ORDER BY t.input_set_id, t.id
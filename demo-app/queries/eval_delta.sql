@@ -0,0 +1,57 @@
+WITH RECURSIVE input_nodes AS (
+    SELECT
+        id,
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
+),
+-- The delta table holds the changes of the input values, relative to the
+-- image the activation table was computed for. Input sets without any change
+-- have no rows, so their number is given as a parameter.
+input_sets AS (
+    SELECT range AS input_set_id FROM range(?)
+),
+tx AS (
+    -- Base case: the change of the input nodes is the delta itself.
+    SELECT
+        d.input_set_id,
+        i.id,
+        d.delta
+    FROM delta d
+    JOIN input_nodes i ON i.input_node_idx = d.input_node_idx
+    WHERE d.delta <> 0
+
+    UNION ALL
+
+    -- Recursive case: only the edges leaving a changed node are followed. A
+    -- node's new value is its cached value before the ReLU plus the change of
+    -- its weighted sum. Nodes whose value doesn't change (e.g. they stay
+    -- clipped by the ReLU) are left out, so nothing is propagated past them.
+    SELECT
+        t.input_set_id,
+        t.id,
+        t.delta
+    FROM (
+        SELECT
+            tx.input_set_id,
+            e.dst AS id,
+            CASE
+                WHEN a.is_output THEN SUM(e.weight * tx.delta)
+                ELSE GREATEST(0, a.z + SUM(e.weight * tx.delta)) - a.value
+            END AS delta
+        FROM tx
+        JOIN edge e ON tx.id = e.src
+        JOIN activation a ON e.dst = a.id
+        GROUP BY tx.input_set_id, e.dst, a.z, a.value, a.is_output
+    ) t
+    WHERE t.delta <> 0
+)
+SELECT
+    s.input_set_id,
+    a.id,
+    a.value + COALESCE(tx.delta, 0) AS value
+FROM input_sets s
+CROSS JOIN activation a
+LEFT JOIN tx ON tx.input_set_id = s.input_set_id AND tx.id = a.id
+WHERE a.is_output
+ORDER BY s.input_set_id, a.id;
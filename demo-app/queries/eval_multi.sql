@@ -1,71 +1,98 @@
+-- Evaluates a single model of the database, the one with the ID passed as the
+-- first parameter. Every node and edge is filtered on it up front, so the
+-- recursion only ever touches that model (rather than one recursion over all
+-- models, with a copy of the input per model). They are materialized, since
+-- node and edge can be views that resolve the model (see the versioned schema
+-- in database.py), which should happen once rather than in every step.
 WITH RECURSIVE
+nodes AS MATERIALIZED (
+    SELECT id, bias, unit_idx, is_input, is_output
+    FROM node
+    WHERE model_id = $1
+),
+edges AS MATERIALIZED (
+    SELECT src, dst, weight
+    FROM edge
+    WHERE model_id = $1
+),
 input_values AS (
-    SELECT m.id AS model_id, input_set_id, input_node_idx, input_value
+    SELECT input_set_id, input_node_idx, input_value
     FROM input
-    CROSS JOIN model m
 ),
 input_nodes AS (
     SELECT
-        model_id,
         id,
-        ROW_NUMBER() OVER (PARTITION BY model_id ORDER BY id) AS input_node_idx
-    FROM node
-    WHERE id NOT IN
-    (SELECT dst FROM edge)
+        unit_idx AS input_node_idx
+    FROM nodes
+    WHERE is_input
 ),
 output_nodes AS (
-    SELECT model_id, id
-    FROM node
-    WHERE id NOT IN
-    (SELECT src FROM edge)
+    SELECT id, unit_idx
+    FROM nodes
+    WHERE is_output
 ),
 tx AS (
     SELECT
-        i.model_id,
         v.input_set_id AS input_set_id,
         GREATEST(
             0,
             n.bias + SUM(e.weight * v.input_value)
         ) AS value,
         e.dst AS id
-    FROM edge e
+    FROM edges e
     JOIN input_nodes i ON i.id = e.src
-    JOIN node n ON e.dst = n.id
-    JOIN input_values v ON i.input_node_idx = v.input_node_idx AND v.model_id = i.model_id
-    GROUP BY i.model_id, e.dst, n.bias, v.input_set_id
+    JOIN nodes n ON e.dst = n.id
+    JOIN input_values v ON i.input_node_idx = v.input_node_idx
+    GROUP BY e.dst, n.bias, v.input_set_id
 
     UNION ALL
 
     SELECT
-        tx.model_id,
         tx.input_set_id AS input_set_id,
         GREATEST(
             0,
             n.bias + SUM(e.weight * tx.value)
         ) AS value,
         e.dst AS id
-    FROM edge e
-    JOIN tx ON tx.id = e.src AND tx.model_id = e.model_id
-    JOIN node n ON e.dst = n.id
-    GROUP BY tx.model_id, e.dst, n.bias, tx.input_set_id
+    FROM edges e
+    JOIN tx ON tx.id = e.src
+    JOIN nodes n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, tx.input_set_id
 ),
 t_out AS (
     SELECT
-        tx.model_id,
         tx.input_set_id AS input_set_id,
         n.bias + SUM(e.weight * tx.value) AS value,
-        e.dst AS id
-    FROM edge e
+        e.dst AS id,
+        o.unit_idx
+    FROM edges e
     JOIN output_nodes o ON e.dst = o.id
-    JOIN node n ON o.id = n.id
-    JOIN tx ON tx.id = e.src AND tx.model_id = e.model_id
-    GROUP BY tx.model_id, e.dst, n.bias, tx.input_set_id
+    JOIN nodes n ON o.id = n.id
+    JOIN tx ON tx.id = e.src
+    GROUP BY e.dst, o.unit_idx, n.bias, tx.input_set_id
+),
+-- The log-softmax per input set, shifted by the maximum for numerical
+-- stability: x - max - ln(sum(exp(x - max))).
+log_softmax AS (
+    SELECT
+        *,
+        value - MAX(value) OVER (PARTITION BY input_set_id) AS shifted
+    FROM t_out
 )
 SELECT
+    t.input_set_id,
     m.id,
     m.name,
     t.value AS output_value,
-    t.id AS output_id
-FROM model m
-JOIN t_out t ON t.model_id = m.id
-ORDER BY m.id, t.id
+    t.id AS output_id,
+    t.shifted - LN(SUM(EXP(t.shifted)) OVER input_set) AS log_softmax,
+    -- The predicted digit is the output with the highest value (unit_idx
+    -- starts at 1).
+    t.shifted = 0
+        AND t.unit_idx = MIN(t.unit_idx) FILTER (t.shifted = 0) OVER input_set
+        AS is_prediction,
+    t.unit_idx - 1 AS digit
+FROM log_softmax t
+JOIN model m ON m.id = $1
+WINDOW input_set AS (PARTITION BY t.input_set_id)
+ORDER BY t.input_set_id, t.id
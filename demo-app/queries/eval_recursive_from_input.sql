@@ -5,16 +5,14 @@ input_nodes AS (
     SELECT
         id,
         bias,
-        ROW_NUMBER() OVER (ORDER BY id) AS input_node_idx
+        unit_idx AS input_node_idx
     FROM node
-    WHERE id NOT IN
-    (SELECT dst FROM edge)
+    WHERE is_input
 ),
 output_nodes AS (
     SELECT id
     FROM node
-    WHERE id NOT IN
-    (SELECT src FROM edge)
+    WHERE is_output
 ),
 tx AS (
     SELECT
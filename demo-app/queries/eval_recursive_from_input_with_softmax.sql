@@ -5,16 +5,14 @@ input_nodes AS (
     SELECT
         id,
         bias,
-        ROW_NUMBER() OVER (ORDER BY id) AS input_node_idx
-    FROM node n
-    WHERE NOT EXISTS
-    (SELECT 1 FROM edge WHERE dst = n.id)
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
 ),
 output_nodes AS (
     SELECT id
-    FROM node n
-    WHERE NOT EXISTS
-    (SELECT 1 FROM edge WHERE src = n.id)
+    FROM node
+    WHERE is_output
 ),
 -- Eval
 tx AS (
@@ -1,14 +1,7 @@
-WITH input_nodes AS (
-    SELECT id
-    FROM node
-    WHERE id NOT IN
-    (SELECT dst FROM edge)
-),
-num_biases AS (
+WITH num_biases AS (
     SELECT COUNT(bias) AS num_biases
     FROM node
-    WHERE id NOT IN (SELECT id FROM input_nodes)
-
+    WHERE NOT is_input
 ),
 num_weights AS (
     SELECT COUNT(weight) AS num_weights FROM edge
@@ -0,0 +1,63 @@
+-- How much the weights and biases of a layer changed from one model (the
+-- first parameter) to another one with the same architecture (the second
+-- parameter), e.g. between two epochs. Both models are lined up on the
+-- position of their nodes and edges, so comparing them is a join on a single
+-- integer column rather than on the names of the nodes.
+--
+-- The weights of a layer are those of its incoming edges. A sign flip is a
+-- weight or bias that went from positive to negative or vice versa.
+--
+-- Everything is counted as stored, per edge and per node. For a convolution,
+-- that is once per output pixel for every kernel weight and channel bias, so
+-- num_edges, num_nodes, l1, l2, max_change and num_sign_flips are those of
+-- the expanded network, not of the parameters of the model. Every kernel
+-- weight and bias of a layer is repeated equally often, so relative_l2 is the
+-- same as for the parameters themselves.
+WITH edge_diff AS (
+    SELECT
+        TRUE AS is_edge,
+        a.src_layer + 1 AS layer,
+        a.weight AS old_value,
+        b.weight - a.weight AS diff,
+        SIGN(a.weight) * SIGN(b.weight) < 0 AS is_sign_flip
+    FROM edge a
+    JOIN edge b ON b.position = a.position
+    WHERE a.model_id = $1 AND b.model_id = $2
+),
+node_diff AS (
+    SELECT
+        FALSE AS is_edge,
+        a.layer,
+        a.bias AS old_value,
+        b.bias - a.bias AS diff,
+        SIGN(a.bias) * SIGN(b.bias) < 0 AS is_sign_flip
+    FROM node a
+    JOIN node b ON b.position = a.position
+    WHERE a.model_id = $1 AND b.model_id = $2 AND NOT a.is_input
+),
+-- The nodes are named after their layer in the state_dict (e.g. conv1.0.5.3).
+layer_names AS (
+    SELECT DISTINCT layer, SPLIT_PART(name, '.', 1) AS name
+    FROM node
+    WHERE model_id = $1 AND NOT is_input
+),
+diff AS (
+    SELECT * FROM edge_diff
+    UNION ALL
+    SELECT * FROM node_diff
+)
+SELECT
+    d.layer,
+    l.name,
+    COUNT(*) FILTER (d.is_edge) AS num_edges,
+    COUNT(*) FILTER (NOT d.is_edge) AS num_nodes,
+    SUM(ABS(d.diff)) AS l1,
+    SQRT(SUM(d.diff * d.diff)) AS l2,
+    SQRT(SUM(d.diff * d.diff)) / NULLIF(SQRT(SUM(d.old_value * d.old_value)), 0)
+        AS relative_l2,
+    MAX(ABS(d.diff)) AS max_change,
+    COUNT(*) FILTER (d.is_sign_flip) AS num_sign_flips
+FROM diff d
+JOIN layer_names l ON l.layer = d.layer
+GROUP BY d.layer, l.name
+ORDER BY d.layer;
@@ -0,0 +1,28 @@
+-- The neurons that changed the most from one model (the first parameter) to
+-- another one with the same architecture (the second parameter), limited to
+-- the top k (the third parameter). The change of a neuron is the L2 norm of
+-- the change of its bias and incoming weights. Nodes and edges are lined up on
+-- their position, as in model_drift.sql.
+WITH edge_diff AS (
+    SELECT
+        a.dst,
+        SUM((b.weight - a.weight) * (b.weight - a.weight)) AS squared_diff,
+        COUNT(*) FILTER (SIGN(a.weight) * SIGN(b.weight) < 0) AS num_sign_flips
+    FROM edge a
+    JOIN edge b ON b.position = a.position
+    WHERE a.model_id = $1 AND b.model_id = $2
+    GROUP BY a.dst
+)
+SELECT
+    a.position,
+    a.name,
+    a.layer,
+    b.bias - a.bias AS bias_change,
+    SQRT(e.squared_diff + (b.bias - a.bias) * (b.bias - a.bias)) AS l2,
+    e.num_sign_flips + (SIGN(a.bias) * SIGN(b.bias) < 0)::INTEGER AS num_sign_flips
+FROM node a
+JOIN node b ON b.position = a.position
+JOIN edge_diff e ON e.dst = a.id
+WHERE a.model_id = $1 AND b.model_id = $2
+ORDER BY l2 DESC, a.position
+LIMIT $3;
@@ -0,0 +1,21 @@
+WITH bounds AS (
+    -- The start and end of the range. A bound before the first point falls in
+    -- the first segment, which extends to the left.
+    SELECT
+        bound,
+        x,
+        GREATEST(x, (SELECT MIN(x) FROM pwl)) AS lookup_x
+    FROM (VALUES ('start', ?::DOUBLE), ('end', ?::DOUBLE)) b(bound, x)
+),
+-- The area from the first point up to each bound: the area up to the start of
+-- the segment it falls in, plus the part of that segment up to the bound.
+area_up_to AS (
+    SELECT
+        b.bound,
+        p.area + p.y * (b.x - p.x) + p.slope / 2 * POW(b.x - p.x, 2) AS area
+    FROM bounds b
+    ASOF JOIN pwl p ON b.lookup_x >= p.x
+)
+SELECT
+    MAX(area) FILTER (bound = 'end') - MAX(area) FILTER (bound = 'start') AS integral
+FROM area_up_to;
@@ -0,0 +1,27 @@
+-- Stores the result of pwl.sql, together with the area under the PWL from the
+-- first point up to each point, so the integral over any range only needs a
+-- lookup of its bounds (see pwl_integral.sql). Expects pwl.sql as a view named
+-- pwl_points, e.g. CREATE TEMP VIEW pwl_points AS <pwl.sql>.
+CREATE OR REPLACE TEMP TABLE pwl AS
+WITH segment_areas AS (
+    -- The area of the segment from each point to the next one
+    SELECT
+        x,
+        y,
+        slope,
+        y * (LEAD(x) OVER (ORDER BY x) - x)
+            + slope / 2 * POW(LEAD(x) OVER (ORDER BY x) - x, 2) AS segment_area
+    FROM pwl_points
+)
+SELECT
+    x,
+    y,
+    slope,
+    COALESCE(
+        SUM(segment_area) OVER (
+            ORDER BY x ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+        ),
+        0
+    ) AS area
+FROM segment_areas
+ORDER BY x;
@@ -1,29 +1,9 @@
-WITH num_input_nodes AS (
-  SELECT model_id, COUNT(id) AS num_input_nodes
+WITH num_hidden_nodes AS (
+  SELECT model_id, COUNT(id) AS num_hidden_nodes
   FROM node
-  WHERE id NOT IN (SELECT dst FROM edge)
+  WHERE is_hidden
   GROUP BY model_id
 ),
-num_output_nodes AS (
-  SELECT model_id, COUNT(id) AS num_output_nodes
-  FROM node
-  WHERE id NOT IN (SELECT src FROM edge)
-  GROUP BY model_id
-),
-num_total_nodes AS (
-  SELECT model_id, COUNT(id) AS num_nodes
-  FROM node
-  GROUP BY model_id
-),
-num_hidden_nodes AS (
-  SELECT
-    t.model_id,
-    t.num_nodes - i.num_input_nodes - o.num_output_nodes AS num_hidden_nodes
-  FROM num_total_nodes t
-  JOIN num_input_nodes i ON i.model_id = t.model_id
-  JOIN num_output_nodes o ON o.model_id = t.model_id
-  GROUP BY t.model_id, t.num_nodes, i.num_input_nodes, o.num_output_nodes
-),
 prunable_nodes AS (
   SELECT
     model_id,
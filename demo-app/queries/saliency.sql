@@ -6,18 +6,14 @@ input_nodes AS (
     SELECT
         id,
         bias,
-        ROW_NUMBER() OVER (ORDER BY id) AS input_node_idx
-    FROM node n
-    -- NOT EXISTS is faster
-    WHERE NOT EXISTS
-        (SELECT 1 FROM edge WHERE dst = n.id)
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
 ),
 output_nodes AS (
     SELECT id, bias
-    FROM node n
-    -- NOT EXISTS is faster
-    WHERE NOT EXISTS
-    (SELECT 1 FROM edge WHERE src=n.id)
+    FROM node
+    WHERE is_output
 ),
 tx AS (
     -- Base case (t1)
@@ -2,20 +2,16 @@ WITH RECURSIVE input_nodes AS (
     SELECT
         id,
         bias,
-        ROW_NUMBER() OVER (ORDER BY id) AS input_node_idx
-    FROM node n
-    WHERE NOT EXISTS (
-        SELECT 1 FROM edge e WHERE e.dst = n.id
-    )
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
 ),
 output_nodes AS (
     SELECT
         id,
         bias
-    FROM node n
-    WHERE NOT EXISTS (
-        SELECT 1 FROM edge e WHERE e.src = n.id
-    )
+    FROM node
+    WHERE is_output
 ),
 input_values AS (
     SELECT
@@ -23,7 +19,6 @@ input_values AS (
         input_node_idx,
         input_value
     FROM input
-    WHERE input_set_id = 0 -- TODO
 ),
 first_layer_activations AS (
     SELECT
@@ -87,30 +82,28 @@ input_contributions AS (
     INNER JOIN first_layer_grouped flg ON f.dst = flg.dst AND f.input_set_id = flg.input_set_id
     INNER JOIN node n ON f.dst = n.id
 ),
+-- The contribution of each input node to the first layer, summed over all of
+-- its outgoing edges at once.
+contributions AS (
+    SELECT
+        ic.input_set_id,
+        ic.input_node_id,
+        SUM(ic.contribution_factor * tx.value) AS contribution
+    FROM input_contributions ic
+    INNER JOIN tx ON ic.dst = tx.id AND ic.input_set_id = tx.input_set_id
+    GROUP BY ic.input_set_id, ic.input_node_id
+),
 saliency AS (
     SELECT
         b.input_set_id,
         i.id AS removed_neuron_id,
         b.value AS eval,
-        b.value - (
-            SELECT SUM(ic.contribution_factor * tx2.value)
-            FROM input_contributions ic
-            INNER JOIN tx tx2 ON ic.dst = tx2.id
-            WHERE ic.input_node_id = i.id
-            AND ic.input_set_id = b.input_set_id
-        ) AS eval_prime,
-        ABS(b.value - (
-            b.value - (
-                SELECT SUM(ic.contribution_factor * tx2.value)
-                FROM input_contributions ic
-                INNER JOIN tx tx2 ON ic.dst = tx2.id
-                WHERE ic.input_node_id = i.id
-                AND ic.input_set_id = b.input_set_id
-            )
-        )) AS saliency,
+        b.value - c.contribution AS eval_prime,
+        ABS(c.contribution) AS saliency,
         b.output_node_id
     FROM base_output b
     CROSS JOIN input_nodes i
+    LEFT JOIN contributions c ON c.input_set_id = b.input_set_id AND c.input_node_id = i.id
 )
 SELECT * FROM saliency
-ORDER BY removed_neuron_id, output_node_id;
+ORDER BY input_set_id, removed_neuron_id, output_node_id;
@@ -0,0 +1,70 @@
+WITH RECURSIVE image AS (
+    -- The input table holds a single image
+    SELECT input_node_idx, input_value FROM input
+),
+input_values AS (
+    -- Input set k is the image with pixel k removed, for every pixel k from
+    -- $first to $last.
+    SELECT r.k AS input_set_id, i.input_node_idx, i.input_value
+    FROM range($first, $last + 1) r(k)
+    JOIN image i ON i.input_node_idx <> r.k
+),
+input_nodes AS (
+    SELECT
+        id,
+        bias,
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
+),
+output_nodes AS (
+    SELECT id, bias
+    FROM node
+    WHERE is_output
+),
+tx AS (
+    -- Base case (t1)
+    SELECT
+        v.input_set_id AS input_set_id,
+        GREATEST(0, n.bias + SUM(e.weight * v.input_value)) AS value,
+        e.dst AS id,
+    -- JOIN order matters for performance!
+    FROM input_nodes i
+    JOIN input_values v ON i.input_node_idx = v.input_node_idx
+    JOIN edge e ON i.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, v.input_set_id
+
+    UNION ALL
+
+    -- Recursive case
+    SELECT
+        tx.input_set_id AS input_set_id,
+        GREATEST(0, n.bias + SUM(e.weight * tx.value)) AS value,
+        e.dst AS id,
+    FROM tx
+    JOIN edge e ON tx.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, tx.input_set_id
+),
+-- As the last step, repeat the calculation for the output nodes, but omit the
+-- ReLU this time (per definition)
+t_out AS (
+    SELECT
+        tx.input_set_id AS input_set_id,
+        o.bias + SUM(e.weight * tx.value) AS value,
+        e.dst AS id
+    FROM output_nodes o
+    JOIN edge e ON e.dst = o.id
+    JOIN tx ON tx.id = e.src
+    GROUP BY e.dst, o.bias, tx.input_set_id
+)
+-- The saliency of a pixel is how much removing it changes the prediction:
+-- output node $predicted_id, with value $predicted_value for the unaltered
+-- image. The prediction is computed once beforehand, not again in every chunk.
+SELECT
+    t.input_set_id AS input_node_idx,
+    ABS(t.value - $predicted_value) AS saliency
+FROM t_out t
+WHERE t.id = $predicted_id
+ORDER BY t.input_set_id;
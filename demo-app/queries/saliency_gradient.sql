@@ -0,0 +1,88 @@
+WITH RECURSIVE input_values AS (
+    SELECT input_set_id, input_node_idx, input_value FROM input
+),
+input_nodes AS (
+    SELECT
+        id,
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
+),
+-- Forward pass: the eval, keeping the value of each node before the ReLU (z).
+-- A hidden node passes on gradients only where z > 0.
+fx AS (
+    SELECT
+        v.input_set_id,
+        e.dst AS id,
+        n.bias + SUM(e.weight * v.input_value) AS z
+    FROM input_nodes i
+    JOIN input_values v ON i.input_node_idx = v.input_node_idx
+    JOIN edge e ON i.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, v.input_set_id
+
+    UNION ALL
+
+    SELECT
+        fx.input_set_id,
+        e.dst AS id,
+        n.bias + SUM(e.weight * GREATEST(0, fx.z)) AS z
+    FROM fx
+    JOIN edge e ON fx.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, fx.input_set_id
+),
+-- The output node with the highest value is the prediction of an input set.
+prediction AS (
+    SELECT
+        fx.input_set_id,
+        ARG_MAX(fx.id, fx.z) AS id
+    FROM fx
+    JOIN node n ON fx.id = n.id
+    WHERE n.is_output
+    GROUP BY fx.input_set_id
+),
+-- Backward pass: the gradient of the prediction with respect to every node,
+-- from the output back to the input layer. A node's gradient is the weighted
+-- sum of the gradients of the nodes it feeds into, times the derivative of
+-- its ReLU. Zero gradients aren't propagated any further.
+gx AS (
+    SELECT
+        input_set_id,
+        id,
+        -- Cast, so the recursive part isn't rounded to the type of this literal
+        1.0::DOUBLE AS gradient
+    FROM prediction
+
+    UNION ALL
+
+    SELECT
+        t.input_set_id,
+        t.id,
+        t.gradient
+    FROM (
+        SELECT
+            gx.input_set_id,
+            e.src AS id,
+            CASE
+                WHEN n.is_input OR f.z > 0 THEN SUM(e.weight * gx.gradient)
+                ELSE 0
+            END AS gradient
+        FROM gx
+        JOIN edge e ON gx.id = e.dst
+        JOIN node n ON e.src = n.id
+        LEFT JOIN fx f ON f.input_set_id = gx.input_set_id AND f.id = e.src
+        GROUP BY gx.input_set_id, e.src, n.is_input, f.z
+    ) t
+    WHERE t.gradient <> 0
+)
+-- The saliency of a pixel is the magnitude of its gradient.
+SELECT
+    v.input_set_id,
+    v.input_node_idx,
+    COALESCE(gx.gradient, 0) AS gradient,
+    ABS(COALESCE(gx.gradient, 0)) AS saliency
+FROM input_values v
+JOIN input_nodes i ON i.input_node_idx = v.input_node_idx
+LEFT JOIN gx ON gx.input_set_id = v.input_set_id AND gx.id = i.id
+ORDER BY v.input_set_id, v.input_node_idx;
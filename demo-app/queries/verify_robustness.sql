@@ -0,0 +1,126 @@
+-- Interval bound propagation: for every input set, each input value may vary
+-- within a distance epsilon (the first parameter), clipped to the range of
+-- valid input values (the second and third parameter). The bounds of each node
+-- follow from the bounds of the layer before: a positive weight maps the lower
+-- bound of its source to the lower bound of its destination, a negative one
+-- the upper bound. In terms of the center and radius of an interval, this is
+-- center' = bias + SUM(weight * center), radius' = SUM(|weight| * radius).
+WITH RECURSIVE input_values AS (
+    SELECT input_set_id, input_node_idx, input_value FROM input
+),
+input_nodes AS (
+    SELECT
+        id,
+        unit_idx AS input_node_idx
+    FROM node
+    WHERE is_input
+),
+output_nodes AS (
+    SELECT id, bias
+    FROM node
+    WHERE is_output
+),
+input_bounds AS (
+    SELECT
+        v.input_set_id,
+        i.id,
+        v.input_value AS value,
+        GREATEST(v.input_value - $1, $2) AS lower_bound,
+        LEAST(v.input_value + $1, $3) AS upper_bound
+    FROM input_nodes i
+    JOIN input_values v ON i.input_node_idx = v.input_node_idx
+),
+-- The eval itself is done alongside, for the prediction.
+tx AS (
+    SELECT
+        b.input_set_id,
+        e.dst AS id,
+        GREATEST(0, n.bias + SUM(e.weight * b.value)) AS value,
+        GREATEST(
+            0,
+            n.bias
+            + SUM(e.weight * (b.lower_bound + b.upper_bound) / 2)
+            - SUM(ABS(e.weight) * (b.upper_bound - b.lower_bound) / 2)
+        ) AS lower_bound,
+        GREATEST(
+            0,
+            n.bias
+            + SUM(e.weight * (b.lower_bound + b.upper_bound) / 2)
+            + SUM(ABS(e.weight) * (b.upper_bound - b.lower_bound) / 2)
+        ) AS upper_bound
+    FROM input_bounds b
+    JOIN edge e ON b.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, b.input_set_id
+
+    UNION ALL
+
+    SELECT
+        tx.input_set_id,
+        e.dst AS id,
+        GREATEST(0, n.bias + SUM(e.weight * tx.value)) AS value,
+        GREATEST(
+            0,
+            n.bias
+            + SUM(e.weight * (tx.lower_bound + tx.upper_bound) / 2)
+            - SUM(ABS(e.weight) * (tx.upper_bound - tx.lower_bound) / 2)
+        ) AS lower_bound,
+        GREATEST(
+            0,
+            n.bias
+            + SUM(e.weight * (tx.lower_bound + tx.upper_bound) / 2)
+            + SUM(ABS(e.weight) * (tx.upper_bound - tx.lower_bound) / 2)
+        ) AS upper_bound
+    FROM tx
+    JOIN edge e ON tx.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, tx.input_set_id
+),
+-- As the last step, repeat the calculation for the output nodes, but omit the
+-- ReLU this time (per definition)
+t_out AS (
+    SELECT
+        tx.input_set_id,
+        e.dst AS id,
+        o.bias + SUM(e.weight * tx.value) AS value,
+        o.bias
+        + SUM(e.weight * (tx.lower_bound + tx.upper_bound) / 2)
+        - SUM(ABS(e.weight) * (tx.upper_bound - tx.lower_bound) / 2) AS lower_bound,
+        o.bias
+        + SUM(e.weight * (tx.lower_bound + tx.upper_bound) / 2)
+        + SUM(ABS(e.weight) * (tx.upper_bound - tx.lower_bound) / 2) AS upper_bound
+    FROM output_nodes o
+    JOIN edge e ON e.dst = o.id
+    JOIN tx ON tx.id = e.src
+    GROUP BY e.dst, o.bias, tx.input_set_id
+),
+prediction AS (
+    SELECT
+        input_set_id,
+        ARG_MAX(id, value) AS id
+    FROM t_out
+    GROUP BY input_set_id
+),
+-- The prediction is certified if its lower bound exceeds the upper bound of
+-- every other output node, for all inputs within the bounds.
+verdict AS (
+    SELECT
+        t.input_set_id,
+        MIN(t.lower_bound) FILTER (t.id = p.id)
+            > COALESCE(MAX(t.upper_bound) FILTER (t.id <> p.id), '-inf'::DOUBLE) AS is_robust
+    FROM t_out t
+    JOIN prediction p ON t.input_set_id = p.input_set_id
+    GROUP BY t.input_set_id
+)
+SELECT
+    t.input_set_id,
+    t.id,
+    t.value,
+    t.lower_bound,
+    t.upper_bound,
+    t.id = p.id AS is_prediction,
+    v.is_robust
+FROM t_out t
+JOIN prediction p ON t.input_set_id = p.input_set_id
+JOIN verdict v ON t.input_set_id = v.input_set_id
+ORDER BY t.input_set_id, t.id;
@@ -2,31 +2,37 @@ import numpy as np
 import matplotlib.pyplot as plt
 from io import BytesIO
 import settings
-from concurrent.futures import ProcessPoolExecutor
+from incremental import IncrementalEvaluator
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 
 with open(settings.EVAL_SALIENCY_PATH) as file:
     query = file.read()
 
+with open(settings.EVAL_SALIENCY_BATCHED_PATH) as file:
+    batched_query = file.read()
 
-con = None
+with open(settings.EVAL_SALIENCY_GRADIENT_PATH) as file:
+    gradient_query = file.read()
 
 
-def fetch_data(i):
-    return con.execute(query, [i]).fetchall()
+def fetch_data(evaluator, image, i):
+    # Every thread gets its own cursor. DuckDB releases the GIL while running
+    # the query, so these run in parallel.
+    with evaluator.cursor(image) as cursor:
+        return cursor.execute(query, [i]).fetchall()
 
 
-def get_saliency_map(_con):
-    # This is a hack to avoid multiple connections/pickle issues...
-    global con
-    con = _con
-
-    actual_result = con.execute(query, [-1]).fetchall()
+def get_saliency_map(evaluator, image):
+    actual_result = fetch_data(evaluator, image, -1)
     max_actual = max([row[1] for row in actual_result])
     guessed_digit = max(range(len(actual_result)), key=lambda i: actual_result[i][1])
 
-    with ProcessPoolExecutor() as executor:
-        all_results = list(executor.map(fetch_data, range(1, 28 * 28 + 1)))
+    with ThreadPoolExecutor() as executor:
+        all_results = list(
+            executor.map(partial(fetch_data, evaluator, image), range(1, 28 * 28 + 1))
+        )
 
     diffs = []
     for results in all_results:
@@ -36,6 +42,71 @@ def get_saliency_map(_con):
     return np.array(diffs).reshape((28, 28))
 
 
+def get_saliency_map_batched(evaluator, image, chunk_size=196):
+    """
+    The same saliency map, but every image with a pixel removed is an input set
+    of the batched saliency query, which also computes the differences. The
+    pixels are done in chunks of `chunk_size`, to bound the size of the
+    intermediate results. DuckDB parallelizes each chunk by itself.
+
+    The unaltered image is evaluated only once, to find the prediction the
+    chunks are compared against.
+    """
+    num_pixels = evaluator.input_size
+    saliency = []
+    with evaluator.cursor(image) as cursor:
+        # No pixel has index -1, so nothing is removed.
+        actual = cursor.execute(query, [-1]).fetchnumpy()
+        guessed = actual["value"].argmax()
+        params = {
+            "predicted_id": int(actual["id"][guessed]),
+            "predicted_value": float(actual["value"][guessed]),
+        }
+
+        for first in range(1, num_pixels + 1, chunk_size):
+            last = min(first + chunk_size - 1, num_pixels)
+            rows = cursor.execute(
+                batched_query, {**params, "first": first, "last": last}
+            ).fetchnumpy()
+            saliency.append(rows["saliency"])
+
+    return np.concatenate(saliency).reshape((28, 28))
+
+
+def get_saliency_map_incremental(evaluator, image, chunk_size=196):
+    """
+    The same saliency map again, but removing a pixel is evaluated as a change
+    of the input, which is only propagated to the nodes it affects.
+    """
+    incremental = IncrementalEvaluator(evaluator, image)
+    base = incremental.base_output()
+    guessed_node = base["value"].argmax()
+
+    # Removing a pixel is the same as setting it to 0.
+    masked = np.tile(incremental.image, (len(incremental.image), 1))
+    np.fill_diagonal(masked, 0)
+
+    saliency = []
+    for first in range(0, len(masked), chunk_size):
+        results = incremental.eval(masked[first : first + chunk_size])
+        values = results["value"].reshape(-1, len(base["id"]))
+        saliency.append(np.abs(values[:, guessed_node] - base["value"][guessed_node]))
+
+    return np.concatenate(saliency).reshape((28, 28))
+
+
+def get_gradient_saliency_maps(evaluator, images):
+    """
+    Saliency maps as the magnitude of the gradient of the prediction with
+    respect to each pixel: one forward and one backward pass in SQL, for any
+    number of images at once.
+    """
+    with evaluator.cursor(images) as cursor:
+        rows = cursor.execute(gradient_query).fetchnumpy()
+
+    return rows["saliency"].reshape((-1, 28, 28))
+
+
 def to_heatmap_image(saliency_map):
     plt.imshow(saliency_map, cmap="jet")
     plt.axis("off")
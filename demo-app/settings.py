@@ -1,15 +1,26 @@
-DB_SINGLE = "dbs/cnn_single.db"
-DB_MULTIPLE_EPOCHS = "dbs/cnn_multimodel.db"
-DB_MULTIPLE_SIZES = "dbs/cnn_multimodel_size.db"
-DB_BASIC_EVAL = "dbs/eval_basic.db"
-DB_PWL = "dbs/pwl_geometric_sine.db"
+DB_SINGLE = "dbs/cnn_single.duckdb"
+DB_SINGLE_COMPACT = "dbs/cnn_single_compact.duckdb"
+DB_MULTIPLE_EPOCHS = "dbs/cnn_multimodel.duckdb"
+DB_MULTIPLE_SIZES = "dbs/cnn_multimodel_size.duckdb"
+DB_BASIC_EVAL = "dbs/eval_basic.duckdb"
+DB_PWL = "dbs/pwl_geometric_sine.duckdb"
 
 EVAL_QUERY_PATH = "queries/eval_recursive_from_input_with_softmax.sql"
+EVAL_COMPACT_QUERY_PATH = "queries/eval_compact_with_softmax.sql"
 BASIC_EVAL_QUERY_PATH = "queries/eval_recursive_from_input.sql"
 EVAL_MULTI_QUERY_PATH = "queries/eval_multi.sql"
 EVAL_SALIENCY_PATH = "queries/saliency.sql"
+EVAL_SALIENCY_BATCHED_PATH = "queries/saliency_batched.sql"
+EVAL_SALIENCY_GRADIENT_PATH = "queries/saliency_gradient.sql"
+ACTIVATIONS_QUERY_PATH = "queries/activations.sql"
+EVAL_DELTA_QUERY_PATH = "queries/eval_delta.sql"
 PWL_QUERY_PATH = "queries/pwl.sql"
+PWL_MATERIALIZE_QUERY_PATH = "queries/pwl_materialize.sql"
+PWL_INTEGRAL_QUERY_PATH = "queries/pwl_integral.sql"
 SALIENCY_APPROX_QUERY_PATH = "queries/saliency_approximation.sql"
+VERIFY_ROBUSTNESS_QUERY_PATH = "queries/verify_robustness.sql"
+MODEL_DRIFT_QUERY_PATH = "queries/model_drift.sql"
+MODEL_DRIFT_NEURONS_QUERY_PATH = "queries/model_drift_neurons.sql"
 
 MODEL_PATH = "models/mnist_cnn_14.pt"
 BASIC_EVAL_MODEL_PATH = "models/basic_eval.pt"
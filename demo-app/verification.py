@@ -0,0 +1,21 @@
+import settings
+
+
+with open(settings.VERIFY_ROBUSTNESS_QUERY_PATH) as file:
+    robustness_query = file.read()
+
+
+def verify_robustness(evaluator, images, epsilon, min_value, max_value):
+    """
+    Certifies, for each image, that the prediction doesn't change when every
+    pixel is perturbed by at most epsilon (an L-infinity ball), within the range
+    of valid pixel values [min_value, max_value]. The bounds are sound but not
+    tight, so an image that isn't certified may still be robust.
+
+    Returns the value and the certified lower and upper bound of each output
+    node, per image, with the verdict for the image in is_robust.
+    """
+    with evaluator.cursor(images) as cursor:
+        return cursor.execute(
+            robustness_query, [epsilon, min_value, max_value]
+        ).df()
@@ -0,0 +1,53 @@
+WITH RECURSIVE input_values AS (
+    -- The activations of a layer are a single list per input set.
+    SELECT
+        input_set_id,
+        LIST(input_value ORDER BY input_node_idx) AS activations
+    FROM input
+    GROUP BY input_set_id
+),
+output_layer AS (
+    SELECT MAX(layer) AS layer FROM layer_weights
+),
+tx AS (
+    -- Base case: the input layer
+    SELECT
+        input_set_id,
+        0 AS layer,
+        activations
+    FROM input_values
+
+    UNION ALL
+
+    -- Recursive case: each node of the next layer takes the inner product of
+    -- its weights with the activations of the previous layer, so there is no
+    -- join on individual edges.
+    SELECT
+        t.input_set_id,
+        t.layer,
+        LIST(
+            -- No ReLU for the output layer (per definition)
+            CASE WHEN t.layer = o.layer THEN t.value ELSE GREATEST(0, t.value) END
+            ORDER BY t.unit_idx
+        ) AS activations
+    FROM (
+        SELECT
+            tx.input_set_id,
+            w.layer,
+            w.unit_idx,
+            w.bias + list_inner_product(w.weights, tx.activations) AS value
+        FROM tx
+        JOIN layer_weights w ON w.layer = tx.layer + 1
+    ) t
+    CROSS JOIN output_layer o
+    GROUP BY t.input_set_id, t.layer, o.layer
+),
+t_out AS (
+    SELECT
+        tx.input_set_id,
+        UNNEST(RANGE(1, LEN(tx.activations) + 1)) AS unit_idx,
+        UNNEST(tx.activations) AS value
+    FROM tx
+    JOIN output_layer o ON tx.layer = o.layer
+)
+SELECT * FROM t_out ORDER BY input_set_id, unit_idx;
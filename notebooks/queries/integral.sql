@@ -20,75 +20,62 @@ hidden_nodes AS (
         SELECT * FROM output_node
     )
 ),
-break_x AS (
+hidden_units AS (
+    -- Each hidden node contributes v * max(0, w * x + b) to the output, with w
+    -- its input weight, b its bias and v its output weight.
     SELECT
         n.id,
-        (-n.bias) / e.weight AS break_x, -- -b(u) / w(in1, u)
-        ROW_NUMBER() OVER (ORDER BY (-n.bias) / e.weight) AS row_number
+        e_in.weight::DOUBLE AS w,
+        n.bias::DOUBLE AS b,
+        e_out.weight::DOUBLE AS v
     FROM node n
-    JOIN edge e ON e.dst = n.id
-    JOIN input_node i ON e.src = i.id
     JOIN hidden_nodes h ON h.id = n.id
-    WHERE e.weight <> 0
-    ORDER BY break_x
+    JOIN edge e_in ON e_in.dst = n.id
+    JOIN input_node i ON e_in.src = i.id
+    JOIN edge e_out ON e_out.src = n.id
 ),
--- The possible inputs we'll evaluate on for this query.
-vals AS (
-    SELECT break_x AS val FROM break_x
-),
-weight_times_input_value AS (
+-- Left of all breakpoints, the active units are those with a negative input
+-- weight (and those without input weight but with a positive bias).
+leftmost_segment AS (
     SELECT
-        SUM(e.weight * v.val) AS weight_times_value,
-        e.dst AS id,
-        v.val AS input_value
-    FROM edge e
-    JOIN input_node i ON i.id = e.src
-    CROSS JOIN vals v
-    GROUP BY e.dst, v.val
+        (SELECT n.bias::DOUBLE FROM node n JOIN output_node o ON o.id = n.id)
+        + SUM(CASE WHEN w < 0 OR (w = 0 AND b > 0) THEN v * b ELSE 0 END) AS intercept,
+        SUM(CASE WHEN w < 0 THEN v * w ELSE 0 END) AS slope
+    FROM hidden_units
 ),
-t1 AS (
+-- Going from left to right, a breakpoint switches its unit on (w > 0) or off
+-- (w < 0), which changes the slope and intercept by the unit's contribution.
+breakpoint_changes AS (
     SELECT
-        GREATEST(weight_times_value + n.bias, 0) AS t1_value,
-        input_value,
-        n.id
-    FROM node n
-    JOIN weight_times_input_value i ON i.id = n.id
+        -b / w AS x,
+        SUM(SIGN(w) * v * w) AS slope_change,
+        SUM(SIGN(w) * v * b) AS intercept_change
+    FROM hidden_units
+    WHERE w <> 0
+    GROUP BY x
 ),
-t1_sums AS (
+-- So the line after each breakpoint is a running sum over the sorted
+-- breakpoints, instead of an eval of the network at each of them.
+segments AS (
     SELECT
-        SUM(
-            e.weight *
-            t1.t1_value
-        ) AS sum,
-        t1.input_value,
-        e.dst
-    FROM edge e
-    JOIN t1 ON t1.id = e.src
-    GROUP BY t1.input_value, e.dst
-),
-eval AS (
-    SELECT
-        t.input_value,
-        n.bias + t.sum AS final_output
-    FROM node n
-    JOIN t1_sums t ON t.dst = n.id
-    JOIN output_node o ON o.id = n.id
+        c.x,
+        l.intercept + SUM(c.intercept_change) OVER sweep AS intercept,
+        l.slope + SUM(c.slope_change) OVER sweep AS slope
+    FROM breakpoint_changes c
+    CROSS JOIN leftmost_segment l
+    WINDOW sweep AS (ORDER BY c.x ROWS UNBOUNDED PRECEDING)
 ),
 breaks AS (
     SELECT
-        u1.break_x AS u1_break_x,
-        u2.break_x AS u2_break_x,
-        e1.final_output AS u1_break_y,
-        e2.final_output AS u2_break_y
-    FROM break_x u1
-    JOIN break_x u2 ON u1.row_number = u2.row_number - 1
-    JOIN eval e1 ON u1.break_x = e1.input_value
-    JOIN eval e2 ON u2.break_x = e2.input_value
+        x AS u1_break_x,
+        LEAD(x) OVER (ORDER BY x) AS u2_break_x,
+        intercept + slope * x AS u1_break_y,
+        LEAD(intercept + slope * x) OVER (ORDER BY x) AS u2_break_y
+    FROM segments
 ),
 areas AS (
     SELECT
         0.5 * (u1_break_y + u2_break_y) * (u2_break_x - u1_break_x) AS area
     FROM breaks
 )
-
 SELECT SUM(area) AS integral FROM areas
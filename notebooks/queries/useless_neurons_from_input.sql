@@ -115,5 +115,6 @@ useless_neurons_overview AS (
         ABS(t_out.value - t_out_prime.value) AS delta
     FROM t_out_prime
     JOIN t_out ON t_out.id = t_out_prime.id
+        AND t_out.input_set_id = t_out_prime.input_set_id
 )
 SELECT * FROM useless_neurons_overview ORDER BY h_to_remove;
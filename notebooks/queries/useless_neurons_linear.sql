@@ -0,0 +1,90 @@
+-- Instead of evaluating the network again without each hidden node, which
+-- scales quadratically, we do a single eval and look at what each node passes
+-- on to the next layer:
+--
+-- - is_reachable: whether the node depends on the input at all, i.e. there is a
+--   path of non-zero weights from an input node to it. If not, its value is a
+--   constant that could be folded into the biases of the next layer.
+-- - is_dead: whether its activation is 0 for all input sets, so removing it
+--   doesn't change the output for any of them.
+-- - max_contribution: an upper bound on how much it adds to (or subtracts from)
+--   any node in the next layer, over all input sets: its largest activation
+--   times its largest outgoing weight. The node is considered useless if this
+--   is at most the threshold that is passed as a parameter.
+WITH RECURSIVE inputs AS MATERIALIZED (
+    -- Fetch inputs together
+    SELECT i.input_set_id, i.input_node_idx, i.input_value, n.id
+    FROM input i
+    JOIN (
+        SELECT
+            id,
+            ROW_NUMBER() OVER (ORDER BY id) AS input_node_idx
+        FROM node n
+        WHERE NOT EXISTS
+        (SELECT 1 FROM edge WHERE dst = n.id)
+    ) n ON n.input_node_idx = i.input_node_idx
+),
+hidden_nodes AS MATERIALIZED (
+    SELECT id
+    FROM node n
+    WHERE EXISTS (SELECT 1 FROM edge WHERE src = n.id)
+    AND EXISTS (SELECT 1 FROM edge WHERE dst = n.id)
+),
+-- The regular eval, which carries along whether a node is reachable from the
+-- input.
+tx AS (
+    SELECT
+        i.input_set_id AS input_set_id,
+        GREATEST(
+            0,
+            n.bias + SUM(e.weight * i.input_value)
+        ) AS value,
+        BOOL_OR(e.weight <> 0) AS is_reachable,
+        e.dst AS id
+    FROM inputs i
+    JOIN edge e ON i.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, i.input_set_id
+
+    UNION ALL
+
+    SELECT
+        tx.input_set_id AS input_set_id,
+        GREATEST(
+            0,
+            n.bias + SUM(e.weight * tx.value)
+        ) AS value,
+        BOOL_OR(tx.is_reachable AND e.weight <> 0) AS is_reachable,
+        e.dst AS id
+    FROM tx
+    JOIN edge e ON tx.id = e.src
+    JOIN node n ON e.dst = n.id
+    GROUP BY e.dst, n.bias, tx.input_set_id
+),
+activations AS (
+    SELECT
+        id,
+        MAX(value) AS max_value,
+        BOOL_OR(is_reachable) AS is_reachable
+    FROM tx
+    GROUP BY id
+),
+outgoing_weights AS (
+    SELECT
+        src AS id,
+        MAX(ABS(weight)) AS max_weight
+    FROM edge
+    GROUP BY src
+)
+SELECT
+    h.id,
+    a.is_reachable,
+    a.max_value = 0 AS is_dead,
+    a.max_value,
+    w.max_weight,
+    a.max_value * w.max_weight AS max_contribution,
+    a.max_value * w.max_weight <= $1 AS is_useless
+FROM hidden_nodes h
+JOIN activations a ON a.id = h.id
+JOIN outgoing_weights w ON w.id = h.id
+ORDER BY h.id;
@@ -0,0 +1,89 @@
+-- The same analysis as useless_neurons_linear.sql, for all models in the
+-- database at once. Every model gets the input sets of the input table. Every
+-- join and grouping is keyed on the model as well, like in eval_multi.sql, so
+-- the models are kept apart even if node IDs repeat between them.
+WITH RECURSIVE inputs AS MATERIALIZED (
+    SELECT n.model_id, i.input_set_id, i.input_node_idx, i.input_value, n.id
+    FROM input i
+    JOIN (
+        SELECT
+            model_id,
+            id,
+            -- Numbered separately per model.
+            ROW_NUMBER() OVER (PARTITION BY model_id ORDER BY id) AS input_node_idx
+        FROM node n
+        WHERE NOT EXISTS
+        (SELECT 1 FROM edge e WHERE e.dst = n.id AND e.model_id = n.model_id)
+    ) n ON n.input_node_idx = i.input_node_idx
+),
+hidden_nodes AS MATERIALIZED (
+    SELECT model_id, id
+    FROM node n
+    WHERE EXISTS
+    (SELECT 1 FROM edge e WHERE e.src = n.id AND e.model_id = n.model_id)
+    AND EXISTS
+    (SELECT 1 FROM edge e WHERE e.dst = n.id AND e.model_id = n.model_id)
+),
+tx AS (
+    SELECT
+        i.model_id,
+        i.input_set_id AS input_set_id,
+        GREATEST(
+            0,
+            n.bias + SUM(e.weight * i.input_value)
+        ) AS value,
+        BOOL_OR(e.weight <> 0) AS is_reachable,
+        e.dst AS id
+    FROM inputs i
+    JOIN edge e ON i.id = e.src AND i.model_id = e.model_id
+    JOIN node n ON e.dst = n.id AND n.model_id = e.model_id
+    GROUP BY i.model_id, e.dst, n.bias, i.input_set_id
+
+    UNION ALL
+
+    SELECT
+        tx.model_id,
+        tx.input_set_id AS input_set_id,
+        GREATEST(
+            0,
+            n.bias + SUM(e.weight * tx.value)
+        ) AS value,
+        BOOL_OR(tx.is_reachable AND e.weight <> 0) AS is_reachable,
+        e.dst AS id
+    FROM tx
+    JOIN edge e ON tx.id = e.src AND tx.model_id = e.model_id
+    JOIN node n ON e.dst = n.id AND n.model_id = e.model_id
+    GROUP BY tx.model_id, e.dst, n.bias, tx.input_set_id
+),
+activations AS (
+    SELECT
+        model_id,
+        id,
+        MAX(value) AS max_value,
+        BOOL_OR(is_reachable) AS is_reachable
+    FROM tx
+    GROUP BY model_id, id
+),
+outgoing_weights AS (
+    SELECT
+        model_id,
+        src AS id,
+        MAX(ABS(weight)) AS max_weight
+    FROM edge
+    GROUP BY model_id, src
+)
+SELECT
+    m.id AS model_id,
+    m.name,
+    h.id,
+    a.is_reachable,
+    a.max_value = 0 AS is_dead,
+    a.max_value,
+    w.max_weight,
+    a.max_value * w.max_weight AS max_contribution,
+    a.max_value * w.max_weight <= $1 AS is_useless
+FROM model m
+JOIN hidden_nodes h ON h.model_id = m.id
+JOIN activations a ON a.id = h.id AND a.model_id = h.model_id
+JOIN outgoing_weights w ON w.id = h.id AND w.model_id = h.model_id
+ORDER BY m.id, h.id;
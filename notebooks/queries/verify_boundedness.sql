@@ -20,75 +20,68 @@ hidden_nodes AS (
         SELECT * FROM output_nodes
     )
 ),
-breakpoint_values AS (
+hidden_units AS (
+    -- Each hidden node contributes v * max(0, w * x + b) to the output, with w
+    -- its input weight, b its bias and v its output weight.
     SELECT
-        (-n.bias) / e.weight AS break_x,
+        n.id,
+        e_in.weight::DOUBLE AS w,
+        n.bias::DOUBLE AS b,
+        e_out.weight::DOUBLE AS v
     FROM node n
-    JOIN edge e ON e.dst = n.id
-    JOIN input_nodes i ON e.src = i.id
     JOIN hidden_nodes h ON h.id = n.id
-    WHERE e.weight <> 0
-    GROUP BY break_x, n.id
-    ORDER BY break_x
+    JOIN edge e_in ON e_in.dst = n.id
+    JOIN input_nodes i ON e_in.src = i.id
+    JOIN edge e_out ON e_out.src = n.id
 ),
-breakpoints_unordered AS (
-    (SELECT break_x FROM breakpoint_values)
-    UNION
-    (SELECT MIN(break_x) - 100.0 AS break_x FROM breakpoint_values)
-    UNION
-    (SELECT MAX(break_x) + 100.0 AS break_x FROM breakpoint_values)
-),
-breakpoints AS (
-    SELECT
-        break_x,
-        ROW_NUMBER() OVER (ORDER BY break_x) AS row_number
-    FROM breakpoints_unordered
-),
-
-input_values AS (
-    SELECT break_x AS input_value FROM breakpoints
-),
-t1 AS (
+-- Left of all breakpoints, the active units are those with a negative input
+-- weight (and those without input weight but with a positive bias).
+leftmost_segment AS (
     SELECT
-        v.input_value,
-        GREATEST(
-            0,
-            n.bias + SUM(e.weight * v.input_value)
-        ) AS t1,
-        e.dst AS id
-    FROM edge e
-    JOIN input_nodes i ON i.id = e.src
-    JOIN node n ON e.dst = n.id
-    CROSS JOIN input_values v
-    GROUP BY v.input_value, e.dst, n.bias
+        (SELECT n.bias::DOUBLE FROM node n JOIN output_nodes o ON o.id = n.id)
+        + SUM(CASE WHEN w < 0 OR (w = 0 AND b > 0) THEN v * b ELSE 0 END) AS intercept,
+        SUM(CASE WHEN w < 0 THEN v * w ELSE 0 END) AS slope
+    FROM hidden_units
 ),
-output_values AS (
+-- Going from left to right, a breakpoint switches its unit on (w > 0) or off
+-- (w < 0), which changes the slope and intercept by the unit's contribution.
+breakpoint_changes AS (
     SELECT
-        t1.input_value,
-        n.bias + SUM(e.weight * t1.t1) AS output_value,
-        e.dst AS output_node_id
-    FROM edge e
-    JOIN t1 ON t1.id = e.src
-    JOIN node n ON e.dst = n.id
-    GROUP BY t1.input_value, e.dst, n.bias
+        -b / w AS x,
+        SUM(SIGN(w) * v * w) AS slope_change,
+        SUM(SIGN(w) * v * b) AS intercept_change
+    FROM hidden_units
+    WHERE w <> 0
+    GROUP BY x
 ),
-breakpoint_pairs AS (
+-- So the line after each breakpoint is a running sum over the sorted
+-- breakpoints, instead of an eval of the network at each of them.
+segments AS (
     SELECT
-        u1.break_x AS u1_break_x,
-        u2.break_x AS u2_break_x,
-        e1.output_value AS u1_break_y,
-        e2.output_value AS u2_break_y
-    FROM breakpoints u1
-    JOIN breakpoints u2 ON u1.row_number = u2.row_number - 1
-    JOIN output_values e1 ON u1.break_x = e1.input_value
-    JOIN output_values e2 ON u2.break_x = e2.input_value
+        c.x,
+        l.intercept + SUM(c.intercept_change) OVER sweep AS intercept,
+        l.slope + SUM(c.slope_change) OVER sweep AS slope
+    FROM breakpoint_changes c
+    CROSS JOIN leftmost_segment l
+    WINDOW sweep AS (ORDER BY c.x ROWS UNBOUNDED PRECEDING)
 ),
 points_and_slopes AS (
+    -- A point left of the first breakpoint
+    SELECT
+        MIN(s.x) - 100.0 AS x,
+        l.intercept + l.slope * (MIN(s.x) - 100.0) AS y,
+        l.slope
+    FROM segments s
+    CROSS JOIN leftmost_segment l
+    GROUP BY l.intercept, l.slope
+
+    UNION ALL
+
     SELECT
-        u1_break_x AS x,
-        u1_break_y AS y,
-        (u2_break_y - u1_break_y) / (u2_break_x - u1_break_x) AS slope
-    FROM breakpoint_pairs
+        x,
+        intercept + slope * x AS y,
+        slope
+    FROM segments
 ),
 all_points_in_range AS (
     SELECT x, y FROM points_and_slopes
@@ -1,19 +1,16 @@
 import os
-import shutil
 import duckdb
 import itertools
+import numpy as np
 import pandas as pd
 
 
 con = duckdb.connect()
 
-EXPORT_DIR = "dbs/network.db"
+DB_PATH = "dbs/network.duckdb"
 
 
 def _initialize_database():
-    if os.path.isdir(EXPORT_DIR):
-        shutil.rmtree(EXPORT_DIR)
-
     con.execute("DROP TABLE IF EXISTS edge")
     con.execute("DROP TABLE IF EXISTS node")
     con.execute("DROP SEQUENCE IF EXISTS seq_node")
@@ -25,7 +22,12 @@ def _initialize_database():
         CREATE TABLE node(
             id INTEGER PRIMARY KEY DEFAULT NEXTVAL('seq_node'),
             bias REAL,
-            name TEXT
+            name TEXT,
+            layer INTEGER,
+            unit_idx INTEGER,
+            is_input BOOLEAN,
+            is_hidden BOOLEAN,
+            is_output BOOLEAN
         )"""
     )
     # Foreign keys are omitted for performance.
@@ -34,7 +36,8 @@ def _initialize_database():
         CREATE TABLE edge(
             src INTEGER,
             dst INTEGER,
-            weight REAL
+            weight REAL,
+            src_layer INTEGER
         )"""
     )
 
@@ -48,7 +51,7 @@ def _initialize_database():
     )
 
 
-def reconnect():
+def reconnect(path=":memory:"):
     global con
 
     try:
@@ -56,7 +59,49 @@ def reconnect():
     except Exception:
         pass
 
-    con = duckdb.connect()
+    con = duckdb.connect(path)
+
+
+def attach(path):
+    """
+    Opens a saved network read-only, replacing the current connection. The file
+    is attached rather than imported, so nothing is loaded up front. The input
+    table lives on the connection as a temporary table, because the attached
+    database can't be written to.
+    """
+    reconnect()
+
+    con.execute(f"ATTACH '{path}' AS model (READ_ONLY)")
+    con.execute("USE model")
+    con.execute(
+        """
+        CREATE TEMP TABLE input(
+            input_set_id INTEGER,
+            input_node_idx INTEGER,
+            input_value REAL
+        )"""
+    )
+
+
+def save(path=DB_PATH):
+    """
+    Saves the network to a native DuckDB file, which can then be opened with
+    attach(). The tables are copied without their defaults, since those depend
+    on seq_node, which can't be carried over to another database.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    tables = con.execute(
+        "SELECT table_name FROM duckdb_tables() WHERE database_name = 'memory'"
+    ).fetchall()
+
+    con.execute(f"ATTACH '{path}' AS persisted")
+    try:
+        for (table,) in tables:
+            con.execute(f"CREATE TABLE persisted.{table} AS FROM memory.{table}")
+    finally:
+        con.execute("DETACH persisted")
 
 
 def load_pytorch_model_into_db(model):
@@ -67,6 +112,9 @@ def batch_insert(generator, table, batch_size=8_000_000):
     """
     Inserts data in batches into duckdb, to find a middle ground between
     performance and memory consumption. A batch size of 10M consumes ~4GB RAM.
+
+    The rows may leave out the last columns of the table (e.g. only provide the
+    id, bias and name of a node), these are left empty.
     """
     while True:
         chunk = list(itertools.islice(generator, batch_size))
@@ -74,65 +122,362 @@ def batch_insert(generator, table, batch_size=8_000_000):
             break
 
         df = pd.DataFrame(chunk)
-        con.execute(f"INSERT INTO {table} SELECT * FROM df")
+        columns = ", ".join(con.table(table).columns[: len(df.columns)])
+        con.execute(f"INSERT INTO {table} ({columns}) SELECT * FROM df")
+
+
+def _to_numpy(tensor):
+    if isinstance(tensor, np.ndarray):
+        return tensor
+
+    return tensor.detach().cpu().numpy()
+
+
+def _layers(state_dict):
+    """
+    Returns the (weight, bias) arrays per layer. The state_dict alternates
+    between weight and bias tensors.
+    """
+    weights = [_to_numpy(v) for name, v in state_dict.items() if "weight" in name]
+    biases = [
+        (name, _to_numpy(v)) for name, v in state_dict.items() if "bias" in name
+    ]
 
+    return list(zip(weights, biases))
 
-def load_state_dict_into_db(state_dict):
+
+def load_state_dict_into_db(state_dict, batch_size=8_000_000):
+    """
+    Loads a fully connected network into the database. The node and edge columns
+    are computed from the weight tensors with NumPy, and DuckDB scans the arrays
+    directly. Edges are inserted in chunks of at most batch_size rows, so memory
+    stays bounded by the chunk instead of by the largest layer.
+    """
     _initialize_database()
+    _insert_network(con, state_dict, batch_size=batch_size)
+    save()
+
+
+def _initialize_multimodel_database():
+    """
+    The same tables as in the multimodel databases of the demo app: every node
+    and edge belongs to a model, and node IDs are unique over all models. Nodes
+    and edges also get their position, their number within their own model, to
+    line up the models of the same architecture (e.g. the epochs of a training).
+    """
+    con.execute("DROP TABLE IF EXISTS edge")
+    con.execute("DROP TABLE IF EXISTS node")
+    con.execute("DROP TABLE IF EXISTS model")
+    con.execute("DROP TABLE IF EXISTS input")
+    con.execute("DROP SEQUENCE IF EXISTS seq_node")
+    con.execute("DROP SEQUENCE IF EXISTS seq_model")
+
+    con.execute("CREATE SEQUENCE seq_model START 1")
+    con.execute(
+        """
+        CREATE TABLE model(
+            id INTEGER PRIMARY KEY DEFAULT NEXTVAL('seq_model'),
+            name TEXT
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE node(
+            id INTEGER PRIMARY KEY,
+            model_id INTEGER,
+            position INTEGER,
+            bias REAL,
+            name TEXT,
+            layer INTEGER,
+            unit_idx INTEGER,
+            is_input BOOLEAN,
+            is_hidden BOOLEAN,
+            is_output BOOLEAN
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE edge(
+            model_id INTEGER,
+            position INTEGER,
+            src INTEGER,
+            dst INTEGER,
+            weight REAL,
+            src_layer INTEGER
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE input(
+            input_set_id INTEGER,
+            input_node_idx INTEGER,
+            input_value REAL
+        )"""
+    )
+
+
+def insert_model(con, state_dict, name):
+    """
+    Adds a fully connected network to the multimodel database (see
+    _initialize_multimodel_database) and returns its model ID. The connection
+    is a parameter, so it can be called on a cursor of its own, e.g. by
+    utils.checkpoints.CheckpointStreamer.
+    """
+    (model_id,) = con.execute(
+        "INSERT INTO model (name) VALUES ($name) RETURNING (id)", {"name": name}
+    ).fetchone()
+
+    _insert_network(con, state_dict, model_id=model_id)
+
+    return model_id
+
+
+def _insert_network(con, state_dict, model_id=None, batch_size=8_000_000):
+    """
+    Inserts the nodes and edges of a fully connected network. The node IDs
+    continue from the highest ID in the database. If a model_id is given, it is
+    added to every node and edge, together with their position in the model.
+    """
+    (max_id_in_db,) = con.execute("SELECT COALESCE(MAX(id), 0) FROM node").fetchone()
+    layers = _layers(state_dict)
+
+    # Node IDs are assigned contiguously per layer, so the IDs of a layer are
+    # fully described by the ID of its first node.
+    num_input_nodes = layers[0][0].shape[1]
+    layer_sizes = [num_input_nodes] + [len(bias) for _, (_, bias) in layers]
+    offsets = np.cumsum([max_id_in_db + 1] + layer_sizes)
+
+    # Layer 0 holds the input nodes, which have no bias.
+    names = ["input"] + [name for _, (name, _) in layers]
+    biases = [np.zeros(num_input_nodes)] + [bias for _, (_, bias) in layers]
+    num_layers = len(layers)
+
+    for layer, (name, bias) in enumerate(zip(names, biases)):
+        num_nodes = len(bias)
+        ids = np.arange(offsets[layer], offsets[layer + 1], dtype=np.int32)
+        nodes = {
+            "id": ids,
+            "bias": bias.astype(np.float32, copy=False),
+            "name": np.char.add(f"{name}.", np.arange(num_nodes).astype(str)),
+            "layer": np.full(num_nodes, layer, dtype=np.int32),
+            "unit_idx": np.arange(1, num_nodes + 1, dtype=np.int32),
+            "is_input": np.full(num_nodes, layer == 0),
+            "is_hidden": np.full(num_nodes, 0 < layer < num_layers),
+            "is_output": np.full(num_nodes, layer == num_layers),
+        }
+        if model_id is not None:
+            nodes["model_id"] = np.full(num_nodes, model_id, dtype=np.int32)
+            nodes["position"] = ids - np.int32(max_id_in_db)
+        con.execute("INSERT INTO node BY NAME SELECT * FROM nodes")
+
+    num_edges_inserted = 0
+    for layer, (weight, _) in enumerate(layers):
+        # Each weight tensor has a row for each node in the next layer. The
+        # columns of this row correspond to the nodes of the current layer.
+        num_dst, num_src = weight.shape
+        src_ids = np.arange(offsets[layer], offsets[layer + 1], dtype=np.int32)
+        dst_ids = np.arange(offsets[layer + 1], offsets[layer + 2], dtype=np.int32)
+
+        src_per_chunk = max(1, batch_size // num_dst)
+        for start in range(0, num_src, src_per_chunk):
+            stop = min(start + src_per_chunk, num_src)
+            num_edges = (stop - start) * num_dst
+            edges = {
+                "src": np.repeat(src_ids[start:stop], num_dst),
+                "dst": np.tile(dst_ids, stop - start),
+                "weight": np.ascontiguousarray(
+                    weight[:, start:stop].T, dtype=np.float32
+                ).ravel(),
+                "src_layer": np.full(num_edges, layer, dtype=np.int32),
+            }
+            if model_id is not None:
+                edges["model_id"] = np.full(num_edges, model_id, dtype=np.int32)
+                edges["position"] = np.arange(
+                    num_edges_inserted + 1,
+                    num_edges_inserted + num_edges + 1,
+                    dtype=np.int32,
+                )
+            num_edges_inserted += num_edges
+            con.execute("INSERT INTO edge BY NAME SELECT * FROM edges")
+
+
+def _initialize_dense_database():
+    """
+    The dense layout stores a fully connected layer as one row per node, with
+    the weights of its incoming edges as a list, ordered by the unit_idx of the
+    source nodes. Layer 0 is the input layer and has no rows.
+    """
+    con.execute("DROP TABLE IF EXISTS layer_weights")
+
+    con.execute(
+        """
+        CREATE TABLE layer_weights(
+            layer INTEGER,
+            unit_idx INTEGER,
+            bias REAL,
+            weights FLOAT[]
+        )"""
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS input(
+            input_set_id INTEGER,
+            input_node_idx INTEGER,
+            input_value REAL
+        )"""
+    )
+
+
+def insert_dense_layer(layer, weight, bias, batch_size=8_000_000):
+    """
+    Inserts a single layer in the dense layout. The lists are built by DuckDB
+    from the flat weight array, which is a lot faster than converting every row
+    to a Python list. This is done in chunks of at most batch_size weights.
+    """
+    weight = _to_numpy(weight)
+    bias = _to_numpy(bias)
+    num_dst, num_src = weight.shape
+
+    dst_per_chunk = max(1, batch_size // num_src)
+    for start in range(0, num_dst, dst_per_chunk):
+        stop = min(start + dst_per_chunk, num_dst)
+        unit_idx = np.arange(start + 1, stop + 1, dtype=np.int32)
+        weights = {
+            "unit_idx": np.repeat(unit_idx, num_src),
+            "src_idx": np.tile(np.arange(num_src, dtype=np.int32), stop - start),
+            "weight": np.ascontiguousarray(
+                weight[start:stop], dtype=np.float32
+            ).ravel(),
+        }
+        biases = {
+            "unit_idx": unit_idx,
+            "bias": bias[start:stop].astype(np.float32, copy=False),
+        }
+        con.execute(
+            """
+            INSERT INTO layer_weights
+            SELECT $layer, w.unit_idx, b.bias, w.weights
+            FROM (
+                SELECT unit_idx, LIST(weight ORDER BY src_idx) AS weights
+                FROM weights
+                GROUP BY unit_idx
+            ) w
+            JOIN biases b ON b.unit_idx = w.unit_idx
+            """,
+            {"layer": layer},
+        )
+
+
+def load_state_dict_into_dense_db(state_dict, batch_size=8_000_000):
+    """
+    Loads a fully connected network into the dense layout (see
+    queries/eval_dense.sql for the matching eval).
+    """
+    _initialize_dense_database()
+
+    for layer, (weight, (_, bias)) in enumerate(_layers(state_dict), start=1):
+        insert_dense_layer(layer, weight, bias, batch_size)
+
+
+def eval_frontier(batch_size=None):
+    """
+    Evaluates the network for all input sets in the input table, one layer at a
+    time. Unlike the recursive eval queries, which keep the activations of every
+    layer around until the end, only the current layer (the frontier) is kept in
+    a temp table, which is replaced by the next layer in each step.
+
+    With a batch_size, the input sets are evaluated batch_size at a time, so
+    memory usage is bounded by the widest layer times the batch size.
+
+    Returns a DataFrame with the output value for each input set and output node,
+    like eval_recursive_from_input.sql. The input nodes are found through
+    is_input and unit_idx, so the network has to be loaded with those filled in
+    (as load_state_dict_into_db does).
+    """
+    input_set_ids = [
+        input_set_id
+        for (input_set_id,) in con.execute(
+            "SELECT DISTINCT input_set_id FROM input ORDER BY input_set_id"
+        ).fetchall()
+    ]
+    batch_size = batch_size or max(len(input_set_ids), 1)
+
+    results = []
+    for start in range(0, len(input_set_ids), batch_size):
+        batch = input_set_ids[start : start + batch_size]
+
+        # The input values are not passed through a ReLU, so the frontier keeps
+        # both the value and the activation of each node.
+        con.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE frontier AS
+            SELECT
+                v.input_set_id,
+                i.id,
+                v.input_value AS value,
+                v.input_value AS activation
+            FROM node i
+            JOIN input v ON i.unit_idx = v.input_node_idx
+            WHERE i.is_input
+            AND v.input_set_id BETWEEN $first AND $last
+            """,
+            {"first": batch[0], "last": batch[-1]},
+        )
+
+        while True:
+            # Edges are stored per layer, so restricting their source to the
+            # ID range of the frontier lets DuckDB skip the rest of the table.
+            (min_id, max_id) = con.execute(
+                "SELECT MIN(id), MAX(id) FROM frontier"
+            ).fetchone()
+            con.execute(
+                """
+                CREATE OR REPLACE TEMP TABLE next_frontier AS
+                SELECT
+                    f.input_set_id,
+                    e.dst AS id,
+                    n.bias + SUM(e.weight * f.activation) AS value,
+                    GREATEST(0, n.bias + SUM(e.weight * f.activation)) AS activation
+                FROM frontier f
+                JOIN edge e ON e.src = f.id
+                JOIN node n ON e.dst = n.id
+                WHERE e.src BETWEEN $min_id AND $max_id
+                GROUP BY f.input_set_id, e.dst, n.bias
+                """,
+                {"min_id": min_id, "max_id": max_id},
+            )
+
+            (num_rows,) = con.execute("SELECT COUNT(*) FROM next_frontier").fetchone()
+            if num_rows == 0:
+                break
+
+            con.execute("DROP TABLE frontier")
+            con.execute("ALTER TABLE next_frontier RENAME TO frontier")
+
+        # The last frontier holds the output nodes, for which the ReLU is omitted.
+        results.append(
+            con.execute(
+                """
+                SELECT input_set_id, id, value
+                FROM frontier
+                ORDER BY input_set_id, id
+                """
+            ).df()
+        )
+
+    con.execute("DROP TABLE IF EXISTS frontier")
+    con.execute("DROP TABLE IF EXISTS next_frontier")
+
+    if not results:
+        return pd.DataFrame(
+            {
+                "input_set_id": pd.Series(dtype="int32"),
+                "id": pd.Series(dtype="int32"),
+                "value": pd.Series(dtype="float64"),
+            }
+        )
 
-    # We keep the node IDs per layer in memory so we can insert the edges later on.
-    node_ids = [[]]
-
-    def nodes():
-        # First, insert the input nodes.
-
-        # Retrieves the input x weights matrix
-        input_weights = list(state_dict.items())[0][1].tolist()
-        num_input_nodes = len(input_weights[0])
-
-        id = 0
-        for i in range(0, num_input_nodes):
-            id += 1
-            yield [id, 0, f"input.{i}"]
-            node_ids[0].append(id)
-
-        layer = 0
-        # In the first pass, insert all nodes with their biases
-        for name, values in state_dict.items():
-            # state_dict alternates between weight and bias tensors.
-            if not "bias" in name:
-                continue
-
-            node_ids.append([])
-
-            layer += 1
-            for i, bias in enumerate(values.tolist()):
-                id += 1
-                yield [id, bias, f"{name}.{i}"]
-                node_ids[layer].append(id)
-
-    def edges():
-        # In the second pass, insert all edges and their weights. This assumes a fully
-        # connected network.
-        layer = 0
-        for name, values in state_dict.items():
-            # state_dict alternates between weight and bias tensors.
-            if not "weight" in name:
-                continue
-
-            # Each weight tensor has a list for each node in the next layer. The
-            # elements of this list correspond to the nodes of the current layer.
-            weight_tensor = values.tolist()
-            for from_index, from_node in enumerate(node_ids[layer]):
-                for to_index, to_node in enumerate(node_ids[layer + 1]):
-                    weight = weight_tensor[to_index][from_index]
-                    yield [from_node, to_node, weight]
-
-            layer += 1
-
-    batch_insert(nodes(), "node")
-    batch_insert(edges(), "edge")
-    con.execute(f"EXPORT DATABASE '{EXPORT_DIR}'")
+    return pd.concat(results, ignore_index=True)
 
 
 def print_db_contents():
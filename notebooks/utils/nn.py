@@ -26,7 +26,12 @@ class ReLUFNN(nn.Module):
         return self.linear_relu_stack(x)
 
 
-def train(model, x_train, y_train, epochs=1000, save_path=None):
+def train(model, x_train, y_train, epochs=1000, save_path=None, callback=None):
+    """
+    Trains the model with full-batch Adam. If given, callback(model, epoch) is
+    called after every epoch, e.g. to store intermediate versions of the model
+    (see utils.checkpoints.CheckpointStreamer).
+    """
     if save_path and os.path.exists(save_path):
         model.load_state_dict(torch.load(save_path, weights_only=True))
         return
@@ -38,7 +43,7 @@ def train(model, x_train, y_train, epochs=1000, save_path=None):
     y_train_tensor = ensure_tensor(y_train).unsqueeze(1)
 
     num_epochs = epochs
-    for _ in range(num_epochs):
+    for epoch in range(num_epochs):
         model.train()
         optimizer.zero_grad()
         outputs = model(x_train_tensor)
@@ -46,6 +51,9 @@ def train(model, x_train, y_train, epochs=1000, save_path=None):
         loss.backward()
         optimizer.step()
 
+        if callback:
+            callback(model, epoch)
+
     if save_path:
         torch.save(model.state_dict(), save_path)
 
@@ -1,10 +1,31 @@
 import os
+import sys
+import threading
+import resource
 import pandas as pd
 import itertools
 import time
+import datetime
 import matplotlib.pyplot as plt
 
 
+RESULTS_PATH = "timings/results.csv"
+
+# Every run is a row, with the memory in bytes. Results of older versions of
+# this module only have the time.
+RESULT_COLUMNS = {
+    "test": "str",
+    "recorded_at": "str",
+    "x": "int",
+    "N": "int",
+    "time": "float",
+    "rows": "float",
+    "peak_rss": "float",
+    "duckdb_memory": "float",
+    "duckdb_temp": "float",
+}
+
+
 class PerfTest:
     def setup_all(self):
         pass
@@ -13,11 +34,149 @@ class PerfTest:
         pass
 
     def run(self, x):
+        """
+        Runs the code under test once. It can return the number of rows it
+        processed, to report the throughput as well.
+        """
         pass
 
     def x_labels(self):
         return []
 
+    def connection(self):
+        """
+        The DuckDB connection the test runs on, to track its memory usage and
+        temporary files (e.g. return db.con). By default nothing is tracked.
+        """
+        return None
+
+
+def _reset_peak_rss():
+    """
+    Resets the peak RSS of the process, so it can be measured per run. This is
+    only possible on Linux; elsewhere the peak is that of the whole process.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss():
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    # ru_maxrss is in kilobytes, except on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+_BYTE_UNITS = {
+    "bytes": 1,
+    "KiB": 2**10,
+    "MiB": 2**20,
+    "GiB": 2**30,
+    "TiB": 2**40,
+}
+
+
+def _parse_bytes(text):
+    value, unit = text.split()
+    return float(value) * _BYTE_UNITS[unit]
+
+
+class _DuckDBMonitor:
+    """
+    Polls the memory usage and the size of the temporary files of a DuckDB
+    database in a background thread while a run is going, and keeps the
+    largest values. The polling runs on a cursor, which doesn't wait for the
+    query on the connection itself.
+
+    Polling slows the query down (by about 15-30% on a GROUP BY benchmark at a
+    10ms interval), so it is only done in a separate run, outside the timed
+    ones.
+    """
+
+    def __init__(self, con, interval=0.01):
+        self.cursor = con.cursor()
+        self.interval = interval
+        self.memory, self.temp = 0, 0
+
+    def __enter__(self):
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._poll, daemon=True)
+        self.thread.start()
+
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        # Whatever is still around after the run counts as well, e.g. for runs
+        # that are shorter than the interval.
+        self._sample()
+
+    def _sample(self):
+        # duckdb_memory() has a breakdown of the memory usage, but can fail
+        # (and take the database down with it) while a query releases memory.
+        # The total in database_size is only available formatted, as in
+        # "1.5 GiB". It is the same for every attached database.
+        memory, temp = self.cursor.execute(
+            """
+            SELECT
+                ANY_VALUE(memory_usage),
+                (SELECT COALESCE(SUM(size), 0) FROM duckdb_temporary_files())
+            FROM pragma_database_size()
+            """
+        ).fetchone()
+
+        self.memory = max(self.memory, _parse_bytes(memory))
+        self.temp = max(self.temp, temp)
+
+    def _poll(self):
+        while not self.stopped.is_set():
+            self._sample()
+            self.stopped.wait(self.interval)
+
+    def close(self):
+        self.cursor.close()
+
+
+def _measure_run(test, x):
+    _reset_peak_rss()
+
+    start = time.perf_counter()
+    rows = test.run(x)
+    stop = time.perf_counter()
+
+    return {"time": stop - start, "rows": rows, "peak_rss": _peak_rss()}
+
+
+def _measure_duckdb_memory(test, x):
+    """
+    The peak DuckDB memory usage and size of the temporary files in an extra,
+    untimed run. NaN if the test doesn't tell which connection it uses.
+    """
+    # Only asked for now, since setup_run might reconnect.
+    con = test.connection()
+    if con is None:
+        return {"duckdb_memory": float("nan"), "duckdb_temp": float("nan")}
+
+    monitor = _DuckDBMonitor(con)
+    try:
+        with monitor:
+            test.run(x)
+    finally:
+        monitor.close()
+
+    return {"duckdb_memory": monitor.memory, "duckdb_temp": monitor.temp}
+
 
 def _all_rows_present(df, N, x_labels):
     ns = range(0, N)
@@ -30,27 +189,108 @@ def _all_rows_present(df, N, x_labels):
     return missing_combinations.empty
 
 
-def measure_performance(test, N=5, force=False):
-    name = type(test).__name__
-    csv_name = f"timings/{name}.csv"
+def _empty_results():
+    return pd.DataFrame(
+        {column: pd.Series(dtype=dtype) for column, dtype in RESULT_COLUMNS.items()}
+    )
 
-    if force and os.path.exists(csv_name):
-        os.remove(csv_name)
 
-    if os.path.exists(csv_name):
-        df = pd.read_csv(csv_name)
+def load_results():
+    """
+    All recorded runs. The timings of older versions of this module
+    (timings/<test>.csv, with only the time per run) are merged in the first
+    time, without a recording date and with the other metrics missing.
+    """
+    if os.path.exists(RESULTS_PATH):
+        results = pd.read_csv(RESULTS_PATH, dtype={"test": str, "recorded_at": str})
     else:
-        df = pd.DataFrame(
-            {
-                "N": pd.Series(dtype="int"),
-                "x": pd.Series(dtype="int"),
-                "time": pd.Series(dtype="float"),
-            }
-        )
+        results = _empty_results()
+
+    legacy = []
+    timings_dir = os.path.dirname(RESULTS_PATH)
+    file_names = sorted(os.listdir(timings_dir)) if os.path.isdir(timings_dir) else []
+    for file_name in file_names:
+        name, extension = os.path.splitext(file_name)
+        path = os.path.join(timings_dir, file_name)
+        if extension != ".csv" or path == RESULTS_PATH:
+            continue
+        if (results["test"] == name).any():
+            continue
+
+        legacy.append(pd.read_csv(path).assign(test=name))
+
+    results = pd.concat([results, *legacy], ignore_index=True)
+    results["recorded_at"] = results["recorded_at"].fillna("")
+
+    return results[list(RESULT_COLUMNS)]
+
+
+def _latest(df):
+    """Only the latest recording of each x."""
+    latest = df.groupby("x")["recorded_at"].transform("max")
+    return df[df["recorded_at"] == latest]
+
+
+def summarize(df):
+    """
+    Summarizes the runs per x: the mean time (as before) and its percentiles,
+    the rows per second, and the peak memory of any of the runs.
+    """
+    df = df.assign(rows_per_second=df["rows"] / df["time"])
+
+    return df.groupby("x", as_index=False).agg(
+        time=("time", "mean"),
+        p50=("time", "median"),
+        p95=("time", lambda t: t.quantile(0.95)),
+        max=("time", "max"),
+        rows_per_second=("rows_per_second", "mean"),
+        peak_rss=("peak_rss", "max"),
+        duckdb_memory=("duckdb_memory", "max"),
+        duckdb_temp=("duckdb_temp", "max"),
+    )
+
+
+def history(test_name):
+    """
+    The summary of every recording of a test, to compare them, e.g. to spot
+    a regression in memory usage or tail latency that the mean doesn't show.
+    """
+    results = load_results()
+    df = results[results["test"] == test_name]
+
+    return (
+        df.groupby("recorded_at", group_keys=True)
+        .apply(summarize, include_groups=False)
+        .reset_index(level=0)
+        .reset_index(drop=True)
+    )
+
+
+def measure_performance(test, N=5, force=False, warmup=0):
+    """
+    Runs the test N times for each of its x labels, after `warmup` runs that
+    aren't recorded (e.g. to load the data into memory first). If the test
+    returns its connection, one more run tracks the DuckDB memory usage, which
+    is stored with each of the N runs. Runs are cached
+    in the results file: only the x labels without results are run, unless
+    force is set, which records all of them again. Earlier recordings are kept,
+    see history().
+
+    Returns the summary of the latest recording per x (see summarize).
+    """
+    name = type(test).__name__
+    # The timestamp identifies the recording, so it has to tell apart runs in
+    # the same second (e.g. a forced rerun right after a first recording).
+    recorded_at = datetime.datetime.now().isoformat(timespec="microseconds")
+
+    results = load_results()
+    df = _latest(results[results["test"] == name])
+    if force:
+        df = df.iloc[0:0]
 
     x_labels = test.x_labels()
     if _all_rows_present(df, N, x_labels):
-        return df.groupby("x", as_index=False)["time"].mean()
+        return summarize(df)
 
     test.setup_all()
 
@@ -64,17 +304,33 @@ def measure_performance(test, N=5, force=False):
 
         test.setup_run(x)
 
-        new_rows = []
-        for n in range(0, N):
-            start = time.perf_counter()
+        for _ in range(0, warmup):
             test.run(x)
-            stop = time.perf_counter()
-            new_rows.append({"N": n, "x": x, "time": stop - start})
 
-        df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
-        df.to_csv(csv_name, index=False)
+        runs = [_measure_run(test, x) for _ in range(0, N)]
+        duckdb_memory = _measure_duckdb_memory(test, x)
+
+        new_rows = pd.DataFrame(
+            [
+                {
+                    "test": name,
+                    "recorded_at": recorded_at,
+                    "x": x,
+                    "N": n,
+                    **run,
+                    **duckdb_memory,
+                }
+                for n, run in enumerate(runs)
+            ],
+            columns=list(RESULT_COLUMNS),
+        ).astype(RESULT_COLUMNS)
+
+        df = pd.concat([df, new_rows], ignore_index=True)
+        results = pd.concat([results, new_rows], ignore_index=True)
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+        results.to_csv(RESULTS_PATH, index=False)
 
-    return df.groupby("x", as_index=False)["time"].mean()
+    return summarize(df)
 
 
 def plot_df(df, x_label):
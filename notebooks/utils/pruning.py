@@ -0,0 +1,207 @@
+import utils.duckdb as db
+
+
+def prepare():
+    """
+    Ranks the hidden nodes of a network with a single input, hidden layer and
+    output once, by their (absolute) outgoing weight, as in the prune_and_verify
+    macros. Pruning k nodes removes the nodes ranked 1 to k.
+
+    Everything that doesn't depend on the number of pruned nodes is stored with
+    the ranking, so each prune level only has to filter and sum it:
+
+    - prune_unit: per hidden node its breakpoint and the change in slope and
+      intercept of the PWL when passing it (see pwl.sql).
+    - prune_removed: per input set in the input table and rank, the output that
+      is lost by pruning the nodes up to that rank.
+    """
+    db.con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE prune_unit AS
+        WITH hidden_units AS (
+            SELECT
+                n.id,
+                e_in.weight::DOUBLE AS w,
+                n.bias::DOUBLE AS b,
+                e_out.weight::DOUBLE AS v
+            FROM node n
+            JOIN edge e_in ON e_in.dst = n.id AND e_in.src_layer = 0
+            JOIN edge e_out ON e_out.src = n.id
+            WHERE n.is_hidden
+        )
+        SELECT
+            ROW_NUMBER() OVER (ORDER BY ABS(v), id) AS rank,
+            w,
+            b,
+            v,
+            CASE WHEN w <> 0 THEN -b / w END AS x,
+            SIGN(w) * v * w AS slope_change,
+            SIGN(w) * v * b AS intercept_change
+        FROM hidden_units
+        """
+    )
+    db.con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE prune_removed AS
+        SELECT
+            i.input_set_id,
+            u.rank,
+            SUM(u.v * GREATEST(0, u.w * i.input_value + u.b)) OVER (
+                PARTITION BY i.input_set_id ORDER BY u.rank
+            ) AS removed
+        FROM input i
+        CROSS JOIN prune_unit u
+        """
+    )
+
+
+def check_prune_levels(
+    levels, monotonic_range=(-1, 1), bounded_range=(-6.28, 6.28), bound=1
+):
+    """
+    Checks the properties of the network for any number of prune levels in a
+    single query, with the prune level as a grouping key:
+
+    - monotonic: the output is increasing on monotonic_range.
+    - bounded: the output stays within [-bound, bound] on bounded_range.
+    - mse: the mean squared difference with the unpruned output, over the input
+      sets in the input table (at the time of prepare()).
+
+    Requires prepare() to be run first.
+    """
+    return db.con.execute(
+        """
+        WITH levels AS (
+            SELECT UNNEST($levels::INTEGER[]) AS level
+        ),
+        kept AS (
+            SELECT l.level, u.*
+            FROM levels l
+            JOIN prune_unit u ON u.rank > l.level
+        ),
+        -- Left of all breakpoints, the active units are those with a negative
+        -- input weight (and those without input weight but a positive bias).
+        leftmost_segment AS (
+            SELECT
+                l.level,
+                (SELECT bias FROM node WHERE is_output)
+                + COALESCE(SUM(k.v * k.b) FILTER (k.w < 0 OR (k.w = 0 AND k.b > 0)), 0)
+                    AS intercept,
+                COALESCE(SUM(k.v * k.w) FILTER (k.w < 0), 0) AS slope
+            FROM levels l
+            LEFT JOIN kept k ON k.level = l.level
+            GROUP BY l.level
+        ),
+        segments AS (
+            SELECT level, '-inf'::DOUBLE AS x, intercept, slope
+            FROM leftmost_segment
+
+            UNION ALL
+
+            SELECT
+                c.level,
+                c.x,
+                l.intercept + SUM(c.intercept_change) OVER sweep,
+                l.slope + SUM(c.slope_change) OVER sweep
+            FROM (
+                SELECT
+                    level,
+                    x,
+                    SUM(intercept_change) AS intercept_change,
+                    SUM(slope_change) AS slope_change
+                FROM kept
+                WHERE x IS NOT NULL
+                GROUP BY level, x
+            ) c
+            JOIN leftmost_segment l ON l.level = c.level
+            WINDOW sweep AS (
+                PARTITION BY c.level ORDER BY c.x ROWS UNBOUNDED PRECEDING
+            )
+        ),
+        segment_ranges AS (
+            SELECT
+                *,
+                COALESCE(
+                    LEAD(x) OVER (PARTITION BY level ORDER BY x), 'inf'::DOUBLE
+                ) AS next_x
+            FROM segments
+        ),
+        properties AS (
+            SELECT
+                level,
+                BOOL_AND(slope > 0) FILTER (
+                    x < $monotonic_upper AND next_x > $monotonic_lower
+                ) AS monotonic,
+                -- A segment takes its extremes at its bounds, clipped to the range
+                BOOL_AND(
+                    ABS(intercept + slope * GREATEST(x, $bounded_lower)) <= $bound
+                    AND ABS(intercept + slope * LEAST(next_x, $bounded_upper)) <= $bound
+                ) FILTER (
+                    x < $bounded_upper AND next_x > $bounded_lower
+                ) AS bounded
+            FROM segment_ranges
+            GROUP BY level
+        ),
+        mse AS (
+            SELECT
+                l.level,
+                COALESCE(AVG(r.removed * r.removed), 0) AS mse
+            FROM levels l
+            LEFT JOIN prune_removed r ON r.rank = l.level
+            GROUP BY l.level
+        )
+        SELECT p.level, p.monotonic, p.bounded, m.mse
+        FROM properties p
+        JOIN mse m ON m.level = p.level
+        ORDER BY p.level
+        """,
+        {
+            "levels": list(levels),
+            "monotonic_lower": monotonic_range[0],
+            "monotonic_upper": monotonic_range[1],
+            "bounded_lower": bounded_range[0],
+            "bounded_upper": bounded_range[1],
+            "bound": bound,
+        },
+    ).df()
+
+
+def max_safe_prune_levels(mse_threshold, **kwargs):
+    """
+    Finds the largest number of nodes that can be pruned while each property
+    still holds (for the MSE: stays at or below mse_threshold), with a binary
+    search per property. This assumes that once a property fails, pruning more
+    nodes doesn't make it hold again. The searches run side by side, so each
+    step checks the levels of all properties in one query.
+
+    The keyword arguments are passed to check_prune_levels. Returns a dict with
+    the maximum safe prune level per property (-1 if even the unpruned network
+    fails).
+    """
+    (num_units,) = db.con.execute("SELECT COUNT(*) FROM prune_unit").fetchone()
+
+    def holds(row, prop):
+        if prop == "mse":
+            return row["mse"] <= mse_threshold
+
+        return bool(row[prop])
+
+    # Per property, the largest level known to hold and the smallest known
+    # to fail.
+    searches = {prop: [-1, num_units + 1] for prop in ["monotonic", "bounded", "mse"]}
+
+    while any(fail - ok > 1 for ok, fail in searches.values()):
+        mids = {
+            prop: (ok + fail) // 2
+            for prop, (ok, fail) in searches.items()
+            if fail - ok > 1
+        }
+        results = check_prune_levels(set(mids.values()), **kwargs).set_index("level")
+
+        for prop, mid in mids.items():
+            if holds(results.loc[mid], prop):
+                searches[prop][0] = mid
+            else:
+                searches[prop][1] = mid
+
+    return {prop: ok for prop, (ok, _) in searches.items()}
@@ -0,0 +1,249 @@
+import threading
+import duckdb
+import numpy as np
+import pandas as pd
+import utils.duckdb as db
+
+
+def _interrupt_after(timeout):
+    """Starts a timer that interrupts the running query after timeout seconds."""
+    if timeout is None:
+        return None
+
+    timer = threading.Timer(timeout, db.con.interrupt)
+    timer.daemon = True
+    timer.start()
+
+    return timer
+
+
+def extract_pwl(lower=-np.inf, upper=np.inf, max_regions=100_000, timeout=None):
+    """
+    Computes the piecewise linear function of the network in the database, for
+    networks with a single input and a single output but any number of hidden
+    layers.
+
+    The input range [lower, upper] is split into linear regions layer by layer.
+    Within a region, every node of the current layer is an affine function of
+    the input. Its ReLU adds a breakpoint where that function crosses zero, so
+    each region is split at the breakpoints of the current layer that fall
+    inside it. In each of the new regions the activations are fixed, which
+    makes the nodes of the next layer affine functions again.
+
+    The number of regions can grow exponentially with the depth, so the
+    extraction stops with a RuntimeError once there are more than max_regions,
+    which also bounds the size of the intermediate tables (regions x the width
+    of a layer). A timeout (in seconds) interrupts it with a TimeoutError.
+
+    Returns a DataFrame with a row per linear region: its bounds (lo, hi) and
+    the slope and intercept of the output on it, ordered by lo.
+    """
+    (num_inputs, num_outputs, num_layers) = db.con.execute(
+        "SELECT COUNT(*) FILTER (is_input), COUNT(*) FILTER (is_output), MAX(layer) FROM node"
+    ).fetchone()
+    if num_inputs != 1 or num_outputs != 1:
+        raise ValueError("Only networks with a single input and output are supported")
+
+    timer = _interrupt_after(timeout)
+    try:
+        # A single region covering the whole input range, in which the first
+        # layer is w * x + b.
+        db.con.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE pwl_region AS
+            SELECT 1 AS region_id, $lower::DOUBLE AS lo, $upper::DOUBLE AS hi
+            """,
+            {"lower": lower, "upper": upper},
+        )
+        db.con.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE pwl_affine AS
+            SELECT
+                1 AS region_id,
+                n.id,
+                e.weight::DOUBLE AS slope,
+                n.bias::DOUBLE AS intercept
+            FROM node n
+            JOIN edge e ON e.dst = n.id
+            WHERE e.src_layer = 0
+            """
+        )
+
+        for layer in range(1, num_layers):
+            _split_regions(max_regions)
+            _next_layer(layer)
+
+        return db.con.execute(
+            """
+            SELECT r.lo, r.hi, a.slope, a.intercept
+            FROM pwl_region r
+            JOIN pwl_affine a ON a.region_id = r.region_id
+            ORDER BY r.lo
+            """
+        ).df()
+    except duckdb.InterruptException:
+        raise TimeoutError(f"PWL extraction took longer than {timeout}s")
+    finally:
+        if timer:
+            timer.cancel()
+
+        db.con.execute("DROP TABLE IF EXISTS pwl_region")
+        db.con.execute("DROP TABLE IF EXISTS pwl_affine")
+        db.con.execute("DROP TABLE IF EXISTS pwl_split")
+
+
+def _split_regions(max_regions):
+    """
+    Splits every region at the breakpoints of the nodes of the current layer
+    that fall inside it. The new regions keep the ID of the region they came
+    from (parent_id) to look up the affine functions of the current layer.
+    """
+    db.con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE pwl_split AS
+        WITH cuts AS (
+            SELECT region_id, lo AS x FROM pwl_region
+
+            UNION
+
+            SELECT r.region_id, -a.intercept / a.slope AS x
+            FROM pwl_affine a
+            JOIN pwl_region r ON r.region_id = a.region_id
+            WHERE a.slope <> 0
+            AND -a.intercept / a.slope > r.lo
+            AND -a.intercept / a.slope < r.hi
+        )
+        SELECT
+            ROW_NUMBER() OVER (ORDER BY c.x) AS region_id,
+            c.region_id AS parent_id,
+            c.x AS lo,
+            COALESCE(
+                LEAD(c.x) OVER (PARTITION BY c.region_id ORDER BY c.x),
+                r.hi
+            ) AS hi
+        FROM cuts c
+        JOIN pwl_region r ON r.region_id = c.region_id
+        """
+    )
+
+    (num_regions,) = db.con.execute("SELECT COUNT(*) FROM pwl_split").fetchone()
+    if num_regions > max_regions:
+        raise RuntimeError(
+            f"The PWL has more than {max_regions} linear regions ({num_regions})"
+        )
+
+
+def _next_layer(layer):
+    """
+    Computes the affine functions of the next layer in each of the new regions.
+    Whether a node is active is the same everywhere in a region, so it is
+    checked in a single point.
+    """
+    db.con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE pwl_affine AS
+        WITH points AS (
+            SELECT
+                region_id,
+                parent_id,
+                CASE
+                    WHEN isinf(lo) AND isinf(hi) THEN 0
+                    WHEN isinf(lo) THEN hi - 1
+                    WHEN isinf(hi) THEN lo + 1
+                    ELSE (lo + hi) / 2
+                END AS x
+            FROM pwl_split
+        ),
+        activations AS (
+            SELECT
+                p.region_id,
+                a.id,
+                a.slope,
+                a.intercept
+            FROM points p
+            JOIN pwl_affine a ON a.region_id = p.parent_id
+            WHERE a.slope * p.x + a.intercept > 0
+        ),
+        contributions AS (
+            SELECT
+                a.region_id,
+                e.dst AS id,
+                SUM(e.weight * a.slope) AS slope,
+                SUM(e.weight * a.intercept) AS intercept
+            FROM activations a
+            JOIN edge e ON e.src = a.id
+            GROUP BY a.region_id, e.dst
+        )
+        -- Nodes without any active inputs in a region are constant there.
+        SELECT
+            r.region_id,
+            n.id,
+            COALESCE(c.slope, 0) AS slope,
+            n.bias + COALESCE(c.intercept, 0) AS intercept
+        FROM pwl_split r
+        CROSS JOIN node n
+        LEFT JOIN contributions c ON c.region_id = r.region_id AND c.id = n.id
+        WHERE n.layer = $layer + 1
+        """,
+        {"layer": layer},
+    )
+
+    db.con.execute("DROP TABLE pwl_region")
+    db.con.execute(
+        "CREATE TEMP TABLE pwl_region AS SELECT region_id, lo, hi FROM pwl_split"
+    )
+
+
+def to_points(regions):
+    """
+    The same representation as pwl.sql: the start of each region with the
+    output value there and the slope towards the next one. An unbounded first
+    region starts 10 before the first breakpoint.
+    """
+    x = regions["lo"].to_numpy(copy=True)
+    if len(x) and np.isinf(x[0]):
+        x[0] = (regions["hi"].iloc[0] if len(x) > 1 else 0) - 10.0
+
+    return pd.DataFrame(
+        {
+            "x": x,
+            "y": regions["slope"] * x + regions["intercept"],
+            "slope": regions["slope"],
+        }
+    )
+
+
+def _clip(regions, lower, upper):
+    """The regions that overlap [lower, upper], with their bounds clipped."""
+    lo = np.maximum(regions["lo"].to_numpy(), lower)
+    hi = np.minimum(regions["hi"].to_numpy(), upper)
+    overlaps = lo < hi
+
+    return (
+        lo[overlaps],
+        hi[overlaps],
+        regions["slope"].to_numpy()[overlaps],
+        regions["intercept"].to_numpy()[overlaps],
+    )
+
+
+def integral(regions, lower, upper):
+    lo, hi, slope, intercept = _clip(regions, lower, upper)
+
+    return np.sum(slope / 2 * (hi**2 - lo**2) + intercept * (hi - lo))
+
+
+def is_bounded(regions, lower, upper, bound):
+    """Whether |f(x)| <= bound on [lower, upper]. A linear function takes its
+    extremes at the bounds of a region, so only those are checked."""
+    lo, hi, slope, intercept = _clip(regions, lower, upper)
+    values = np.concatenate([slope * lo + intercept, slope * hi + intercept])
+
+    return bool(np.all(np.abs(values) <= bound))
+
+
+def is_monotonic(regions, lower, upper):
+    """Whether f is non-decreasing or non-increasing on [lower, upper]."""
+    _, _, slope, _ = _clip(regions, lower, upper)
+
+    return bool(np.all(slope >= 0) or np.all(slope <= 0))
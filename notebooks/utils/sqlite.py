@@ -1,10 +1,13 @@
+import numpy as np
 import pandas as pd
 import sqlite3
 
 con = sqlite3.connect("dbs/network.sqlite.db")
 
 
-def load_pytorch_model_into_db(model):
+def _initialize_database():
+    con.execute("DROP INDEX IF EXISTS edge_src")
+    con.execute("DROP INDEX IF EXISTS edge_dst")
     con.execute("DROP TABLE IF EXISTS edge")
     con.execute("DROP TABLE IF EXISTS node")
 
@@ -26,6 +29,14 @@ def load_pytorch_model_into_db(model):
             FOREIGN KEY (dst) REFERENCES node(id)
         )"""
     )
+    con.commit()
+
+
+def load_pytorch_model_into_db(model, bulk=False):
+    if bulk:
+        return bulk_load_state_dict_into_db(model.state_dict())
+
+    _initialize_database()
 
     state_dict = model.state_dict()
 
@@ -103,6 +114,96 @@ def load_pytorch_model_into_db(model):
     con.commit()
 
 
+def _to_numpy(tensor):
+    if isinstance(tensor, np.ndarray):
+        return tensor
+
+    return tensor.detach().cpu().numpy()
+
+
+def bulk_load_state_dict_into_db(state_dict, batch_size=1_000_000):
+    """
+    Loads a fully connected network in bulk. Node IDs are computed up front
+    instead of being read back per insert, rows are written with executemany in
+    a single explicit transaction, and the edge indexes are only built once all
+    rows are in.
+    """
+    _initialize_database()
+
+    weights = [_to_numpy(v) for name, v in state_dict.items() if "weight" in name]
+    biases = [(name, _to_numpy(v)) for name, v in state_dict.items() if "bias" in name]
+
+    # Node IDs are assigned contiguously per layer.
+    num_input_nodes = weights[0].shape[1]
+    layer_sizes = [num_input_nodes] + [len(bias) for _, bias in biases]
+    offsets = np.cumsum([1] + layer_sizes).tolist()
+
+    # These settings trade durability for load speed: a crash during the load
+    # can leave a corrupt file. The journal is kept in memory rather than
+    # turned off, so a failed load can still be rolled back. The previous
+    # values are restored afterwards.
+    pragmas = {
+        "foreign_keys": "OFF",
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "cache_size": -262144,
+    }
+    previous = {name: con.execute(f"PRAGMA {name}").fetchone()[0] for name in pragmas}
+    for name, value in pragmas.items():
+        con.execute(f"PRAGMA {name} = {value}")
+
+    try:
+        con.execute("BEGIN")
+
+        con.executemany(
+            "INSERT INTO node (id, bias, name) VALUES (?, 0, ?)",
+            ((offsets[0] + i, f"input.{i}") for i in range(num_input_nodes)),
+        )
+        for layer, (name, bias) in enumerate(biases, start=1):
+            con.executemany(
+                "INSERT INTO node (id, bias, name) VALUES (?, ?, ?)",
+                zip(
+                    range(offsets[layer], offsets[layer + 1]),
+                    bias.tolist(),
+                    (f"{name}.{i}" for i in range(len(bias))),
+                ),
+            )
+
+        for layer, weight in enumerate(weights):
+            # Each weight tensor has a row for each node in the next layer. The
+            # columns of this row correspond to the nodes of the current layer.
+            num_dst, num_src = weight.shape
+            src_ids = np.arange(offsets[layer], offsets[layer + 1])
+            dst_ids = np.arange(offsets[layer + 1], offsets[layer + 2])
+
+            src_per_chunk = max(1, batch_size // num_dst)
+            for start in range(0, num_src, src_per_chunk):
+                stop = min(start + src_per_chunk, num_src)
+                con.executemany(
+                    "INSERT INTO edge (src, dst, weight) VALUES (?, ?, ?)",
+                    zip(
+                        np.repeat(src_ids[start:stop], num_dst).tolist(),
+                        np.tile(dst_ids, stop - start).tolist(),
+                        weight[:, start:stop].T.ravel().tolist(),
+                    ),
+                )
+
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        for name, value in previous.items():
+            con.execute(f"PRAGMA {name} = {value}")
+
+    # Building the indexes after the load is a lot cheaper than maintaining them
+    # on every insert. The recursive eval joins on both columns.
+    con.execute("CREATE INDEX edge_src ON edge(src)")
+    con.execute("CREATE INDEX edge_dst ON edge(dst)")
+    con.execute("ANALYZE")
+    con.commit()
+
+
 def print_db_contents():
     df = pd.read_sql_query("SELECT name, bias FROM node", con)
     print(df)